@@ -26,7 +26,8 @@ def add_to_database(rs: redis.Redis, name, key, value):
     :param value: represents the value to be added for the database
     :type value: byte
     """
-    rs.hset(name, key, pickle.dumps(value))
+    # the newest protocol is faster and more compact than the default one
+    rs.hset(name, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
 
 
 def get_from_database(rs: redis.Redis, name, key):
@@ -163,8 +164,12 @@ def main():
         print("Found the commit history.")
     else:
         print("Commit history not found.")
+        # ast_dict is already stored, so its graphs can be extended in place.
+        # Nothing else runs yet, so the ASTs can be walked by one process per CPU
         commit_dict = dict(map(lambda key:
-                               (key, rel.create_all_relationships(ast_dict[key])), ast_dict))
+                               (key, rel.create_all_relationships(
+                                   ast_dict[key], max_workers=None, copy=False)),
+                               ast_dict))
         print("Storing relationships...", end="", flush=True)
         add_to_database(rs, repo_name, "commit_dict", commit_dict)
         print("Done!")
@@ -28,27 +28,24 @@ def unique_subgraphs(commit_dict, preset):
     [(<networkx.MultiDiGraph object>, ['d6944b9491b294c02fd0c0d9aff3ae56fa069644', 'b3b0669f716a7b3ed6cd573b57f3f8e12bcd495a']
     """
     graph_commit_pairs = []
+    p = visual.PRESETS[preset]
+
+    # every pass over a view filters the whole commit graph, so the nodes and
+    # edges of each view are read once, and equal graphs are found by their sets
+    pair_of_graph = {}
 
     for sha1 in commit_dict:
         graph = commit_dict[sha1]
-        new_graph = subgraph.subgraph(graph, *visual.PRESETS[preset][0:2])
-        i = 0
-        graph_found = False
-        
-        while (i < len(graph_commit_pairs) and not graph_found):
-            if len(graph_commit_pairs) != 0:
-                g, c = graph_commit_pairs[i]
-
-                # if graph already in tuple list
-                if set(g.nodes) == set(new_graph.nodes) and set(g.edges) == set(new_graph.edges):
-                    # add current sha1 to list of sha1 associated with this graph
-                    graph_commit_pairs[i][1].append(sha1)
-                    graph_found = True
-
-            i += 1
-
-        if not graph_found:
-            graph_commit_pairs.append((new_graph, [sha1]))
+        new_graph = subgraph.subgraph_view(graph, p.nodes, p.edges)
+        key = (frozenset(new_graph.nodes), frozenset(new_graph.edges))
+
+        # if graph already in tuple list
+        if key in pair_of_graph:
+            # add current sha1 to list of sha1 associated with this graph
+            pair_of_graph[key][1].append(sha1)
+        else:
+            pair_of_graph[key] = (new_graph, [sha1])
+            graph_commit_pairs.append(pair_of_graph[key])
 
     return graph_commit_pairs
 
@@ -3,7 +3,10 @@ This module defines node objects to be used in constructing a graph representing
 the file structure of a code repo, and the structure of its Python code files.
 """
 
+import os
+import sys
 from abc import ABC
+from functools import cached_property
 
 
 class Node(ABC):
@@ -48,7 +51,9 @@ class Node(ABC):
         :return: A Node object containing n.
         :rtype: Node
         """
-        self.name = n
+        # names are interned, since they are repeatedly hashed and compared
+        # when building and matching the graph
+        self.name = sys.intern(n)
 
     def get_name(self):
         """
@@ -59,6 +64,35 @@ class Node(ABC):
         """
         return self.name
 
+    @cached_property
+    def path_parts(self):
+        """
+        The parts of the Node's name, split on the path separator. Computed
+        once, or set directly by code that already knows the parts.
+
+        :return: the parts of the name of the Node
+        :rtype: str tuple
+
+        >>> ClassNode('example\\main.py\\A', ast).path_parts
+        ('example', 'main.py', 'A')
+        """
+        # path segments repeat across many nodes, so only one copy of each is kept
+        return tuple(map(sys.intern, self.name.split(os.sep)))
+
+    @cached_property
+    def short_name(self):
+        """
+        The last part of the Node's name, i.e. the folder, file, class, function,
+        or variable name without the path leading to it.
+
+        :return: the last part of the name of the Node
+        :rtype: str
+
+        >>> ClassNode('example\\main.py\\A', ast).short_name
+        'A'
+        """
+        return self.path_parts[-1]
+
 
 class FolderNode(Node):
     """
@@ -73,3 +73,22 @@ def test_get_name(fn, name):
 ])
 def test_to_string(fn, output):
     assert fn.to_string() == output
+
+
+# path_parts
+@pytest.mark.parametrize("fn, parts", [
+    (fold_test_repo, ("test_repo",)),
+    (node.FileNode(os.path.join("test_repo", "a", "a.py"), a_ast),
+     ("test_repo", "a", "a.py")),
+])
+def test_path_parts(fn, parts):
+    assert fn.path_parts == parts
+
+
+# short_name
+@pytest.mark.parametrize("fn, short", [
+    (fold_test_repo, "test_repo"),
+    (node.FileNode(os.path.join("test_repo", "a", "a.py"), a_ast), "a.py"),
+])
+def test_short_name(fn, short):
+    assert fn.short_name == short
@@ -11,6 +11,7 @@ Requires Python 3.8.3 or above.
 """
 
 import os
+import hashlib
 from git import Repo, Git
 import ast
 import node
@@ -43,6 +44,36 @@ def find_dir(start, target):
             return os.path.join(path, target)
 
 
+def parse_source(source, cache=None):
+    """
+    Gives the AST of the Python code ``source``. If ``cache`` is given, the AST
+    is looked up in it by a hash of ``source`` first, and stored in it once
+    parsed. Most files are unchanged from one commit to the next, so the graphs
+    of every commit containing them share one AST, and through it the summary
+    that relationship.py caches per AST. A shared AST must not be modified.
+
+    :param source: the contents of a Python file
+    :type source: bytes
+
+    :param cache: the ASTs parsed so far, keyed by a hash of their source
+    :type cache: dict {bytes : ast.Module}
+
+    :return: the AST of ``source``
+    :rtype: ast.Module
+
+    :raises SyntaxError: if ``source`` is not valid Python code
+    """
+    if cache is None:
+        return ast.parse(source)
+
+    key = hashlib.blake2b(source, digest_size=16).digest()
+    tree = cache.get(key)
+    if tree is None:
+        tree = cache[key] = ast.parse(source)
+
+    return tree
+
+
 def create_branch(graph: nx.Graph, filepath, ast):
     """
     Adds nodes to `graph` to represent the file structure of the Python file
@@ -61,27 +92,60 @@ def create_branch(graph: nx.Graph, filepath, ast):
     :rtype: networkx.Graph
     """
 
-    # add folders
-    i = 0
+    # add folders, extending the path of the previous folder by one part each
+    # time rather than joining the whole path again
     base = filepath[0]
-    while i < len(filepath) - 2:  # add folders until Python file reached
-        next_dir = os.path.join(base, filepath[i + 1])
+    parent = node.FolderNode(base)
+    for part in filepath[1:-1]:  # add folders until Python file reached
+        next_dir = f"{base}{os.sep}{part}"
+        child = node.FolderNode(next_dir)
         # only creates nodes if not already in the graph
-        if (not graph.has_edge(node.FolderNode(base), node.FolderNode(next_dir))):
-            graph.add_edge(node.FolderNode(base), node.FolderNode(
-                next_dir), edge=edge.DirectoryEdge("dir"))
+        if (not graph.has_edge(parent, child)):
+            graph.add_edge(parent, child, edge=edge.DirectoryEdge("dir"))
         base = next_dir
-        i += 1
+        parent = child
 
     # add python file
-    next_dir = os.path.join(base, filepath[i + 1])
-    graph.add_edge(node.FolderNode(base), node.FileNode(
+    next_dir = f"{base}{os.sep}{filepath[-1]}"
+    graph.add_edge(parent, node.FileNode(
         next_dir, ast), edge=edge.DirectoryEdge("dir"))
 
     return graph
 
 
-def create_ast_graph(files, repo_path, repo_name):
+# the git file mode of a symbolic link
+_SYMLINK_MODE = "120000"
+
+
+def list_files(g):
+    """
+    Lists the files tracked in the checked out commit of a git repo, along with
+    the SHA1 of the blob holding the contents of each file.
+
+    :param g: the git module to analyze
+    :type g: Git
+
+    :return: the paths of the files, and a dictionary mapping each path to the
+        SHA1 of its contents. Symbolic links are not in the dictionary, since
+        their blob holds the path they point to rather than its contents.
+    :rtype: str list, dictionary {str : str}
+    """
+    files = []
+    blobs = {}
+
+    # each entry is '<mode> <sha1> <stage>\t<path>', separated by NUL characters
+    for entry in g.ls_files("-s", "-z").split('\0'):
+        if entry:
+            info, path = entry.split('\t', 1)
+            mode, sha1 = info.split(' ')[:2]
+            files.append(path)
+            if mode != _SYMLINK_MODE:
+                blobs[path] = sha1
+
+    return files, blobs
+
+
+def create_ast_graph(files, repo_path, repo_name, blobs=None, cache=None):
     """
     Creates a graph based on a list of files.
 
@@ -94,11 +158,24 @@ def create_ast_graph(files, repo_path, repo_name):
     :param repo_name: the name of the target repo
     :type repo_name: str
 
+    :param blobs: the git blob SHA1 of each file, as given by ``list_files``.
+        Files whose blob is already in ``cache`` are not read from disk.
+    :type blobs: dictionary {str : str}
+
+    :param cache: the ASTs parsed so far, keyed by the blob SHA1 of the file if
+        known, or else by a hash of its source as in ``parse_source``. Files that
+        are not valid Python are stored as None under their blob. Passing the
+        same cache for several commits lets their graphs share the ASTs of
+        unchanged files.
+    :type cache: dict {str or bytes : ast.Module}
+
     :return: a graph representing the files in `repo_path`
     :rtype: networkx.Graph
     """
 
     graph = nx.MultiDiGraph()
+    if cache is None:
+        cache = {}
 
     # create root node as target repo name
     graph.add_node(node.FolderNode(repo_name))
@@ -107,17 +184,29 @@ def create_ast_graph(files, repo_path, repo_name):
         if file.endswith('.py'):
             # print(file)
             file_dir = file.split('/')
-            file_path = os.sep.join([repo_path] + file_dir)
-            with open(file_path) as fin:
-                text = fin.read()
+
+            blob = blobs.get(file) if blobs else None
+            if blob is not None and blob in cache:
+                tree = cache[blob]
+            else:
+                file_path = os.sep.join([repo_path] + file_dir)
+                with open(file_path, "rb") as fin:
+                    source = fin.read()
                 try:
-                    tree = ast.parse(text)
-                    # print(file_dir)
-                    create_branch(graph, [repo_name] + file_dir, tree)
+                    # the blob SHA1 already identifies the source, so the source
+                    # is only hashed when it is unknown
+                    tree = (parse_source(source, cache) if blob is None
+                            else ast.parse(source))
                 except SyntaxError:
-                    pass
                     # if the code that ast parses has a syntax error, it causes
                     # the function call to result in a syntax error.
+                    tree = None
+                if blob is not None:
+                    cache[blob] = tree
+
+            if tree is not None:
+                # print(file_dir)
+                create_branch(graph, [repo_name] + file_dir, tree)
 
     return graph
 
@@ -146,15 +235,17 @@ def create_ast_dict(commits, repo_path, repo_name, g):
     print("Creating ast dictionary...", end="", flush=True)
 
     ast_dict = {}
+    # shared by the commits of this call only, so that it is freed with it
+    cache = {}
 
     for commit in commits:
         # switch into new git branch, parse, and create new graph
         sha1 = commit.hexsha
         g.checkout(sha1)
-        files = g.ls_files().split('\n')
+        files, blobs = list_files(g)
         assert files != None
 
-        graph = create_ast_graph(files, repo_path, repo_name)
+        graph = create_ast_graph(files, repo_path, repo_name, blobs, cache)
 
         ast_dict.update({sha1: graph})
 
@@ -186,16 +277,19 @@ def update_ast_dict(dict, commits, repo_path, repo_name, g):
     """
     print("Updating the dictionary...", end="", flush=True)
 
+    # shared by the commits of this call only, so that it is freed with it
+    cache = {}
+
     # loop through list of commits
     for commit in commits:
         sha1 = commit.hexsha
         if dict.get(sha1) == None:
             # if the file has not been parsed, parse and create new graph
             g.checkout(sha1)
-            files = g.ls_files().split('\n')
+            files, blobs = list_files(g)
             assert files != None
 
-            root = create_ast_graph(files, repo_path, repo_name)
+            root = create_ast_graph(files, repo_path, repo_name, blobs, cache)
 
             dict.update({sha1: root})
 
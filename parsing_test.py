@@ -8,6 +8,7 @@ import edge
 import parsing
 import networkx as nx
 import pytest
+from git import Git
 
 # Find absolute current directory path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -69,3 +70,68 @@ def test_create_ast_graph(g, files, repo_path, repo_name):
     print(list(new_g.edges))
     assert (list(g.nodes) == list(new_g.nodes)) and (
         list(g.edges) == list(new_g.edges))
+
+
+# test parse_source() shares the AST of identical sources through its cache
+def test_parse_source_cache():
+    cache = {}
+    tree = parsing.parse_source(b"x = 1\n", cache)
+    assert parsing.parse_source(b"x = 1\n", cache) is tree
+    assert parsing.parse_source(b"x = 2\n", cache) is not tree
+    assert len(cache) == 2
+    # without a cache, every call parses again
+    assert parsing.parse_source(b"x = 1\n") is not tree
+
+
+# test list_files() gives the tracked files with the blob SHA1 of each
+def test_list_files():
+    files, blobs = parsing.list_files(Git(current_dir))
+    path = "test_repo/b.py"
+    assert path in files
+    assert set(blobs) == set(files)
+    assert blobs[path] == Git(current_dir).hash_object(path)
+
+
+# test a symlinked file is listed without a blob, so that its AST follows the
+# file it points to rather than being reused for the same link
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symbolic links")
+def test_list_files_symlink(tmp_path):
+    (tmp_path / "target.py").write_text("x = 1\n")
+    os.symlink("target.py", tmp_path / "link.py")
+    g = Git(str(tmp_path))
+    g.init()
+    g.add("target.py", "link.py")
+
+    files, blobs = parsing.list_files(g)
+    assert sorted(files) == ["link.py", "target.py"]
+    assert list(blobs) == ["target.py"]
+
+    cache = {}
+    link = node.FileNode(os.path.join("repo", "link.py"), None)
+    g1 = parsing.create_ast_graph(files, str(tmp_path), "repo", blobs, cache)
+    (tmp_path / "target.py").write_text("y = 2\n")
+    g2 = parsing.create_ast_graph(files, str(tmp_path), "repo", blobs, cache)
+
+    ast1 = next(n for n in g1.nodes if n == link).get_ast()
+    ast2 = next(n for n in g2.nodes if n == link).get_ast()
+    assert ast1.body[0].targets[0].id == "x"
+    assert ast2.body[0].targets[0].id == "y"
+
+
+# test create_ast_graph() reuses the AST of a blob it has parsed before, without
+# reading the file again
+def test_create_ast_graph_blobs():
+    repo_path = os.path.join(current_dir, "test_repo")
+    blobs = {"b.py": "b-sha1", "a/a.py": "a-sha1"}
+    cache = {}
+    g1 = parsing.create_ast_graph(["b.py", "a/a.py"], repo_path, "test_repo",
+                                  blobs, cache)
+    assert set(cache) == {"b-sha1", "a-sha1"}
+
+    # the files cannot be read from this path, so their ASTs come from cache
+    g2 = parsing.create_ast_graph(["b.py", "a/a.py"], "missing", "test_repo",
+                                  blobs, cache)
+    asts1 = {n: n.get_ast() for n in g1.nodes if isinstance(n, node.FileNode)}
+    asts2 = {n: n.get_ast() for n in g2.nodes if isinstance(n, node.FileNode)}
+    assert len(asts1) == 2
+    assert all(asts2[n] is tree for n, tree in asts1.items())
@@ -0,0 +1,69 @@
+"""
+This module maps a function over a list in worker processes, for CPU-bound work
+that does not benefit from threads.
+
+>>> import pool
+>>> pool.fork_map(len, [[1], [1, 2]], max_workers=2)
+[1, 2]
+"""
+import os
+
+# the items being mapped by worker processes. The workers are forked, so they
+# inherit this list and only the index of each item has to be sent to them.
+# This avoids pickling items that are slow to pickle, like ASTs, or that pickle
+# more than themselves, like subgraph views.
+_pending = []
+
+
+def _call_pending(func, i, *args):
+    """
+    Worker process entry point that applies ``func`` to the ``i``-th pending item.
+    """
+    return func(_pending[i], *args)
+
+
+def fork_map(func, items, *args, max_workers=1, chunksize=1):
+    """
+    Applies ``func`` to every item of ``items``, followed by ``args``, in worker
+    processes. The workers are only started where the platform forks them by
+    default, since fork is unsafe elsewhere (e.g. macOS), and otherwise ``func``
+    is applied in this process. This must not be called while other threads run,
+    like from a Dash callback.
+
+    :param func: a module-level function, so that it can be sent to the workers
+    :type func: function
+
+    :param items: the items to apply ``func`` to
+    :type items: list
+
+    :param max_workers: the number of worker processes to use, or None for the
+        number of CPUs. Defaults to 1, which applies ``func`` in this process.
+    :type max_workers: int
+
+    :param chunksize: the number of items sent to a worker at once
+    :type chunksize: int
+
+    :return: the result of ``func`` for each item, in order
+    :rtype: list
+    """
+    global _pending
+
+    workers = min(max_workers or os.cpu_count() or 1, len(items))
+
+    if workers > 1:
+        # imported here so that importing this module stays cheap for callers
+        # that never start worker processes
+        import multiprocessing as mp
+        from concurrent.futures import ProcessPoolExecutor
+        from itertools import repeat
+
+        if mp.get_all_start_methods()[0] == "fork":
+            _pending = items
+            try:
+                with ProcessPoolExecutor(workers) as ex:
+                    return list(ex.map(_call_pending, repeat(func), range(len(items)),
+                                       *map(repeat, args), chunksize=chunksize))
+            finally:
+                _pending = []
+
+    return [func(item, *args) for item in items]
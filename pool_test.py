@@ -0,0 +1,23 @@
+"""
+File for testing pool.py module.
+"""
+import pool
+import pytest
+
+
+### fork_map Testing ###
+
+
+# the results are in order, whether or not worker processes are used
+@pytest.mark.parametrize("max_workers", [1, 2, None])
+def test_fork_map(max_workers):
+    items = list(range(100))
+
+    result = pool.fork_map(divmod, items, 7, max_workers=max_workers, chunksize=8)
+
+    assert result == [divmod(i, 7) for i in items]
+    assert pool._pending == []
+
+
+def test_fork_map_empty():
+    assert pool.fork_map(len, [], max_workers=None) == []
@@ -10,11 +10,23 @@ Python 3.8.3 or above.
 
 import ast
 import os
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
 from node import (FileNode, FolderNode, ClassNode, FuncNode,
                   VarNode, LambdaNode, ForNode, IfNode, WhileNode, TryNode)
 import edge
+import pool
 import networkx as nx
 
+# cached separator used when composing node names in hot visitor methods
+_SEP = os.sep
+
+# AST classes compared against on every visit, bound once at import
+_Name, _Attribute, _Store, _Load = ast.Name, ast.Attribute, ast.Store, ast.Load
+_AST, _expr = ast.AST, ast.expr
+_Call, _ClassDef, _Import, _ImportFrom = ast.Call, ast.ClassDef, ast.Import, ast.ImportFrom
+
 
 class CallLister(ast.NodeVisitor):
     """
@@ -79,7 +91,7 @@ class ClassLister(ast.NodeVisitor):
             if type(b) is ast.Name:
                 bases.append(b.id)
 
-            elif type(b) is ast.Attribute:
+            elif type(b) is ast.Attribute and type(b.value) is ast.Name:
                 bases.append(b.value.id)
 
         self.extends.update({node.name: bases})
@@ -135,6 +147,18 @@ class ImportLister(ast.NodeVisitor):
 
         self.imported_funcs.update({node.module: funcs})
 
+    def generic_visit(self, node):
+        """
+        Visits the children of ``node`` that may contain imports. Imports are
+        statements, so expressions are skipped rather than walked.
+
+        :param node: a node within an AST.
+        :type node: AST Node
+        """
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, _expr):
+                self.visit(child)
+
     def reset(self):
         """
         Clears the list of imported modules.
@@ -143,24 +167,354 @@ class ImportLister(ast.NodeVisitor):
         self.imported_funcs = {}
 
 
+# the statement blocks of every node type that can hold an import statement;
+# any other statement cannot hold one and is not looked into
+_BLOCK_FIELDS = {
+    ast.Module: ("body",),
+    ast.FunctionDef: ("body",),
+    ast.AsyncFunctionDef: ("body",),
+    ast.ClassDef: ("body",),
+    ast.If: ("body", "orelse"),
+    ast.For: ("body", "orelse"),
+    ast.AsyncFor: ("body", "orelse"),
+    ast.While: ("body", "orelse"),
+    ast.With: ("body",),
+    ast.AsyncWith: ("body",),
+    ast.Try: ("body", "handlers", "orelse", "finalbody"),
+    ast.ExceptHandler: ("body",),
+}
+if hasattr(ast, "Match"):
+    _BLOCK_FIELDS[ast.Match] = ("cases",)
+    _BLOCK_FIELDS[ast.match_case] = ("body",)
+if hasattr(ast, "TryStar"):
+    _BLOCK_FIELDS[ast.TryStar] = _BLOCK_FIELDS[ast.Try]
+
+
+def collect_imports(tree):
+    """
+    Gathers the imported modules and imported functions of ``tree``, in source
+    order. Imports are statements, so only statement blocks (including the bodies
+    of functions, classes, and except or match clauses) are searched, and no
+    expression is ever walked.
+
+    :param tree: the AST of a Python file
+    :type tree: ast.Module
+
+    :return: the imported modules with their levels, and the names imported
+        from each module
+    :rtype: (str, int) list, dict {str : str list}
+    """
+    mods, funcs = [], {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        t = type(node)
+        if t is _Import:
+            for alias in node.names:
+                mods.append((alias.name, 1))
+            continue
+
+        elif t is _ImportFrom:
+            mods.append((node.module, node.level))
+            funcs[node.module] = [
+                a.name if a.asname is None else a.asname for a in node.names]
+            continue
+
+        blocks = _BLOCK_FIELDS.get(t)
+        if blocks is not None:
+            # push the blocks in reverse so statements are popped in source order
+            for name in reversed(blocks):
+                stack.extend(reversed(getattr(node, name)))
+
+    return mods, funcs
+
+
+@dataclass
+class FileSummary:
+    """
+    The information gathered from a single walk of a Python file's AST: its
+    imports, its function calls, and the classes it defines along with their
+    base classes.
+    """
+    imported_mods: list = field(default_factory=list)
+    imported_funcs: dict = field(default_factory=dict)
+    calls: list = field(default_factory=list)
+    classes: set = field(default_factory=set)
+    extends: dict = field(default_factory=dict)
+
+
+def analyze(tree):
+    """
+    Gathers everything the CallLister, ClassLister, and ImportLister would, but
+    in a single pass over the AST. The nodes are walked with an explicit stack,
+    dispatching on their class directly rather than through ``ast.NodeVisitor``,
+    but still in the same (source) order the visitors would see them.
+
+    :param tree: the AST of a Python file
+    :type tree: ast.Module
+
+    :return: the imports, calls, and classes found in ``tree``
+    :rtype: FileSummary
+    """
+    summary = FileSummary()
+    calls = summary.calls
+    classes = summary.classes
+    extends = summary.extends
+    imported_mods = summary.imported_mods
+    imported_funcs = summary.imported_funcs
+
+    # unlike ast.walk, which is breadth first, pushing each node's children in
+    # reverse keeps the walk depth first and in source order
+    stack = [tree]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        node = pop()
+        t = type(node)
+        if t is _Call:
+            # gather the called function's name
+            func = node.func
+            if type(func) is _Name:
+                calls.append(func.id)
+
+            elif type(func) is _Attribute:
+                calls.append(func.attr)
+
+        elif t is _ClassDef:
+            # gather the name of the defined class, as well as the classes it extends
+            classes.add(node.name)
+            bases = []
+            for b in node.bases:
+                if type(b) is _Name:
+                    bases.append(b.id)
+
+                elif type(b) is _Attribute and type(b.value) is _Name:
+                    bases.append(b.value.id)
+
+            extends[node.name] = bases
+
+        elif t is _Import:
+            # gather all the imported modules
+            for alias in node.names:
+                imported_mods.append((alias.name, 1))
+
+        elif t is _ImportFrom:
+            # gather the imported modules and imported functions, or their alias
+            imported_mods.append((node.module, node.level))
+            imported_funcs[node.module] = [
+                a.name if a.asname is None else a.asname for a in node.names]
+
+        # imports have nothing of interest below them
+        if t is _Import or t is _ImportFrom:
+            continue
+
+        for name in reversed(node._fields):
+            child = getattr(node, name, None)
+            if type(child) is list:
+                for c in reversed(child):
+                    if isinstance(c, _AST):
+                        push(c)
+            elif isinstance(child, _AST):
+                push(child)
+
+    return summary
+
+
+# Maps the AST of a FileNode to its FileSummary. The AST is used as the key
+# rather than the FileNode, since FileNodes from different commits compare equal
+# whenever they share a file path. The keys are weak, so a summary is dropped
+# along with the graph its AST belongs to instead of living as long as the module.
+_file_summary_cache = weakref.WeakKeyDictionary()
+
+# Below this many files, starting worker processes costs more than it saves.
+_PARALLEL_MIN_FILES = 64
+
+
+def summarize_files(file_nodes, max_workers=1):
+    """
+    Fills the FileSummary cache for every node in ``file_nodes``. Large batches
+    may be split across worker processes, see ``pool.fork_map``.
+
+    :param file_nodes: the nodes representing Python files
+    :type file_nodes: FileNode list
+
+    :param max_workers: the number of worker processes to use, or None for the
+        number of CPUs. Defaults to 1, which walks the ASTs in this process.
+    :type max_workers: int
+    """
+    trees = [n.get_ast() for n in file_nodes
+             if n.get_ast() not in _file_summary_cache]
+    if len(trees) < _PARALLEL_MIN_FILES:
+        max_workers = 1
+
+    summaries = pool.fork_map(analyze, trees, max_workers=max_workers, chunksize=32)
+    for tree, summary in zip(trees, summaries):
+        _file_summary_cache[tree] = summary
+
+
+def get_summary(node: FileNode):
+    """
+    Gives the FileSummary of ``node``, walking its AST only the first time it
+    is requested.
+
+    :param node: the node representing a Python file
+    :type node: FileNode
+
+    :return: the imports, calls, and classes found in the file
+    :rtype: FileSummary
+    """
+    return _tree_summary(node.get_ast())
+
+
+def _tree_summary(tree):
+    """
+    Gives the FileSummary of ``tree``, walking it only the first time it is
+    requested.
+
+    :param tree: the AST of a Python file
+    :type tree: ast.Module
+
+    :return: the imports, calls, and classes found in ``tree``
+    :rtype: FileSummary
+    """
+    summary = _file_summary_cache.get(tree)
+    if summary is None:
+        summary = analyze(tree)
+        _file_summary_cache[tree] = summary
+
+    return summary
+
+
+# the kinds of nodes that a VariableEdge can be drawn to
+_VAR_USER_TYPES = frozenset(
+    [FileNode, ClassNode, FuncNode, IfNode, ForNode, WhileNode, TryNode])
+
+
 class NodeMaker(ast.NodeVisitor):
     """
     This class will gather classes, functions, and variables defined within an AST, and add
     Node object representations of them to an existing root.
     """
 
-    def __init__(self, root):
+    def __init__(self, graph):
         """
-        The root to add the ClassNode, FuncNode, and VarNode.
+        The graph to add the ClassNode, FuncNode, and VarNode to. The graph is
+        modified in place, so callers that need the original should pass a copy.
 
-        :param root: the FileNode object corresponding to the Python file of the AST.
-        :type root: Node
+        :param graph: the graph representing the target code repo
+        :type graph: networkx.MultiDiGraph
         """
         super().__init__()
-        # copy the graph to make sure original data is preserved
-        self.graph = nx.MultiDiGraph()
-        self.graph.add_edges_from(root.edges.data())
+        self.graph = graph
         self.starting_node = None
+        # edges are collected while visiting and added to the graph in one call
+        self._pending_edges = []
+        # maps the full name of every node defined while visiting to the node,
+        # so scopes can be searched by name without creating throwaway nodes
+        self._node_by_path = {}
+        # maps the name of each scope to the names of it and its enclosing
+        # scopes, innermost first, up to the scope of the file
+        self._scope_chains = {}
+        # visitor methods keyed by AST class, instead of looked up by name
+        self._dispatch = {
+            ast.ClassDef: self.visit_ClassDef,
+            ast.FunctionDef: self.visit_FunctionDef,
+            ast.Assign: self.visit_Assign,
+            ast.Name: self.visit_Name,
+            ast.Lambda: self.visit_Lambda,
+            ast.For: self.visit_For,
+            ast.While: self.visit_While,
+            ast.Try: self.visit_Try,
+            ast.If: self.visit_If,
+        }
+
+    def visit(self, node):
+        """
+        Visits ``node`` with the visitor method for its class, or visits its
+        children if there is none.
+
+        :param node: a node within an AST.
+        :type node: AST Node
+        """
+        method = self._dispatch.get(type(node))
+        if method is None:
+            self.generic_visit(node)
+        else:
+            method(node)
+
+    def generic_visit(self, node):
+        """
+        Visits the children of ``node``, like ``ast.NodeVisitor.generic_visit``
+        but without going through ``ast.iter_fields``.
+
+        :param node: a node within an AST.
+        :type node: AST Node
+        """
+        visit = self.visit
+        for name in node._fields:
+            child = getattr(node, name, None)
+            if type(child) is list:
+                for c in child:
+                    if isinstance(c, _AST):
+                        visit(c)
+            elif isinstance(child, _AST):
+                visit(child)
+
+    def scope_chain(self, scope):
+        """
+        Gives the names of ``scope`` and the scopes enclosing it, innermost first,
+        ending with the file the scope is in. Computed once per scope.
+
+        :param scope: the node of the scope
+        :type scope: Node
+
+        :return: the names of the enclosing scopes
+        :rtype: str tuple
+
+        >>> node_maker.scope_chain(FuncNode('example\\main.py\\A\\f', ast))
+        ('example\\main.py\\A\\f', 'example\\main.py\\A', 'example\\main.py')
+        """
+        chain = self._scope_chains.get(scope.name)
+        if chain is None:
+            parts = scope.path_parts
+            names = []
+            for i in range(len(parts), 0, -1):
+                names.append(_SEP.join(parts[:i]))
+                # stop after reaching the scope of the file
+                if parts[i - 1].endswith(".py"):
+                    break
+            chain = self._scope_chains[scope.name] = tuple(names)
+
+        return chain
+
+    def add_edge(self, u, v, e):
+        """
+        Queues an edge to be added to the graph by ``add_graph_nodes``.
+
+        :param u: the source node
+        :type u: Node
+
+        :param v: the target node
+        :type v: Node
+
+        :param e: the edge object stored on the edge's ``edge`` attribute
+        :type e: edge.Edge
+        """
+        self._pending_edges.append((u, v, {'edge': e}))
+        self._node_by_path.setdefault(u.name, u)
+        self._node_by_path.setdefault(v.name, v)
+
+    def has_node(self, n):
+        """
+        Checks whether ``n`` is in the graph or has been queued to be added to it.
+
+        :param n: the node to look for
+        :type n: Node
+
+        :return: True if ``n`` is known, False otherwise
+        :rtype: bool
+        """
+        return n.name in self._node_by_path or self.graph.has_node(n)
 
     def change_scope(self, new, node):
         """
@@ -184,11 +538,12 @@ class NodeMaker(ast.NodeVisitor):
         :param node: a node that represents a class definition
         :type node: ast.ClassDef
         """
-        class_name = os.path.join(self.starting_node.name, node.name)
+        class_name = f"{self.starting_node.name}{_SEP}{node.name}"
         class_node = ClassNode(class_name, node)
+        class_node.path_parts = self.starting_node.path_parts + (node.name,)
         # edge (u,v): "u defines v"
-        self.graph.add_edge(self.starting_node, class_node,
-                            edge=edge.DefinitionEdge(""))
+        self.add_edge(self.starting_node, class_node,
+                      edge.DefinitionEdge(""))
 
         # Add FuncNodes as children of this ClassNode
         self.change_scope(class_node, node)
@@ -200,30 +555,39 @@ class NodeMaker(ast.NodeVisitor):
         :param node: a node representing the function definition.
         :type node: ast.FunctionDef
         """
-        func_name = os.path.join(self.starting_node.name, node.name)
+        func_name = f"{self.starting_node.name}{_SEP}{node.name}"
         func_node = FuncNode(func_name, node)
+        func_node.path_parts = self.starting_node.path_parts + (node.name,)
 
         # edge (u,v): "u defines v"
-        self.graph.add_edge(self.starting_node, func_node,
-                            edge=edge.DefinitionEdge(""))
+        self.add_edge(self.starting_node, func_node,
+                      edge.DefinitionEdge(""))
 
         # Add VarNodes as children of this FuncNode
         self.change_scope(func_node, node)
 
     def get_var(self, var_name, level=0):
-        current_path = self.starting_node.get_name()
-        i = len(current_path.split(os.sep)) - level
-
-        # hueristic to look through scopes to try and find variable declaration
-        while i > 0:
-            path = current_path.split(os.sep)[:i]
-            var_node = VarNode(os.path.join(*path, var_name), None)
-            if self.graph.has_node(var_node):
+        """
+        Finds the node defining ``var_name`` in the current scope or the scopes
+        enclosing it, up to the scope of the file.
+
+        :param var_name: the name of the variable
+        :type var_name: str
+
+        :param level: the number of innermost scopes to skip
+        :type level: int
+
+        :return: the node defining ``var_name``, or None if it was not found
+        :rtype: Node
+        """
+        node_by_path = self._node_by_path
+
+        # hueristic to look through scopes to try and find variable declaration,
+        # stopping after searching through entire file scope
+        for scope_name in self.scope_chain(self.starting_node)[level:]:
+            var_node = node_by_path.get(scope_name + _SEP + var_name)
+            if var_node is not None:
                 return var_node
-            # stop search after searching through entire file scope
-            if path[-1].endswith(".py"):
-                break
-            i -= 1
 
         return None
 
@@ -233,24 +597,25 @@ class NodeMaker(ast.NodeVisitor):
         class, or file that defined the variable.
         """
         for name in node.targets:
-            if type(name) is ast.Name and type(name.ctx) is ast.Store:
+            if type(name) is _Name and type(name.ctx) is _Store:
                 var_name = name.id
                 var_node = self.get_var(var_name, level=1)
 
                 # if variable has already been defined
-                if var_node is not None and type(self.starting_node) in [IfNode]:
+                if var_node is not None and type(self.starting_node) is IfNode:
                     # edge (u,v): "control flow statement u modifies variable v"
-                    self.graph.add_edge(self.starting_node, var_node,
-                                        edge=edge.ControlFlowEdge(""))
+                    self.add_edge(self.starting_node, var_node,
+                                  edge.ControlFlowEdge(""))
 
                 # create variable
                 else:
-                    var_name = os.path.join(self.starting_node.name, name.id)
+                    var_name = f"{self.starting_node.name}{_SEP}{name.id}"
                     var_node = VarNode(var_name, node.value)
+                    var_node.path_parts = self.starting_node.path_parts + (name.id,)
 
                     # edge (u,v): "u defines variable v"
-                    self.graph.add_edge(self.starting_node, var_node,
-                                        edge=edge.DefinitionEdge(""))
+                    self.add_edge(self.starting_node, var_node,
+                                  edge.DefinitionEdge(""))
 
                     # See if other nodes are used in this variable assignment
                     self.change_scope(var_node, node)
@@ -263,17 +628,16 @@ class NodeMaker(ast.NodeVisitor):
         :param node: a node representing the variable.
         :type node: ast.Name
         """
-        if type(node.ctx) is ast.Load:
+        if type(node.ctx) is _Load:
             var_name = node.id
             var_node = self.get_var(var_name)
 
-            node_list = [FileNode, ClassNode, FuncNode, IfNode, ForNode, WhileNode, TryNode] 
             # if previously defined variable is used
             if var_node is not None:
-                if type(self.starting_node) in node_list:
+                if type(self.starting_node) in _VAR_USER_TYPES:
                     # edge (u,v): "variable u is used in v"
-                    self.graph.add_edge(var_node, self.starting_node,
-                                        edge=edge.VariableEdge(""))
+                    self.add_edge(var_node, self.starting_node,
+                                  edge.VariableEdge(""))
 
     def visit_Lambda(self, node: ast.Lambda):
         """
@@ -284,17 +648,17 @@ class NodeMaker(ast.NodeVisitor):
         """
         base = self.starting_node.name
         i = 1
-        lambda_node = LambdaNode(os.path.join(base, "lambda1"), node.body)
+        lambda_node = LambdaNode(f"{base}{_SEP}lambda1", node.body)
 
         # might be multiple lambdas in this scope
-        while self.graph.has_node(lambda_node):
+        while self.has_node(lambda_node):
             i += 1
             lamb = "lambda" + str(i)
-            lambda_node = LambdaNode(os.path.join(base, lamb), node.body)
+            lambda_node = LambdaNode(f"{base}{_SEP}{lamb}", node.body)
 
         # edge (u,v): "u defines lambda v"
-        self.graph.add_edge(self.starting_node, lambda_node,
-                            edge=edge.DefinitionEdge(""))
+        self.add_edge(self.starting_node, lambda_node,
+                      edge.DefinitionEdge(""))
 
     def ast_node_types(self):
         """Returns dictionary mapping ast node type to its corresponding visitor functions."""
@@ -317,17 +681,17 @@ class NodeMaker(ast.NodeVisitor):
         """
         base = self.starting_node.name
         i = 1
-        for_node = ForNode(os.path.join(base, "for1"))
+        for_node = ForNode(f"{base}{_SEP}for1")
 
         # might be multiple for loops in this scope
-        while self.graph.has_node(for_node):
+        while self.has_node(for_node):
             i += 1
             for_st = "for" + str(i)
-            for_node = ForNode(os.path.join(base, for_st))
+            for_node = ForNode(f"{base}{_SEP}{for_st}")
 
         # edge (u,v): "u defines for loop v"
-        self.graph.add_edge(self.starting_node, for_node,
-                            edge=edge.DefinitionEdge(""))
+        self.add_edge(self.starting_node, for_node,
+                      edge.DefinitionEdge(""))
 
         # TODO: node.iter - draw VariableEdge to variable being looped over.
         self.change_scope(for_node, node.iter)
@@ -354,17 +718,17 @@ class NodeMaker(ast.NodeVisitor):
         """
         base = self.starting_node.name
         i = 1
-        while_node = WhileNode(os.path.join(base, "while1"))
+        while_node = WhileNode(f"{base}{_SEP}while1")
 
         # might be multiple while loops in this scope
-        while self.graph.has_node(while_node):
+        while self.has_node(while_node):
             i += 1
             while_st = "while" + str(i)
-            while_node = WhileNode(os.path.join(base, while_st))
+            while_node = WhileNode(f"{base}{_SEP}{while_st}")
 
         # edge (u,v): "u defines while loop v"
-        self.graph.add_edge(self.starting_node, while_node,
-                            edge=edge.DefinitionEdge(""))
+        self.add_edge(self.starting_node, while_node,
+                      edge.DefinitionEdge(""))
 
         # node.test - draw VariableEdge if depends on some variable
         self.change_scope(while_node, node.test)
@@ -390,17 +754,17 @@ class NodeMaker(ast.NodeVisitor):
         """
         base = self.starting_node.name
         i = 1
-        try_node = TryNode(os.path.join(base, "try1"))
+        try_node = TryNode(f"{base}{_SEP}try1")
 
         # might be multiple while loops in this scope
-        while self.graph.has_node(try_node):
+        while self.has_node(try_node):
             i += 1
             try_st = "try" + str(i)
-            try_node = TryNode(os.path.join(base, try_st))
+            try_node = TryNode(f"{base}{_SEP}{try_st}")
 
         # edge (u,v): "u defines while loop v"
-        self.graph.add_edge(self.starting_node, try_node,
-                            edge=edge.DefinitionEdge(""))
+        self.add_edge(self.starting_node, try_node,
+                      edge.DefinitionEdge(""))
 
         # TODO: node.body - draw ControlFlowEdge if modifies some variable
         for child in node.body:
@@ -422,17 +786,17 @@ class NodeMaker(ast.NodeVisitor):
         """
         base = self.starting_node.name
         i = 1
-        if_node = IfNode(os.path.join(base, "if1"))
+        if_node = IfNode(f"{base}{_SEP}if1")
 
         # might be multiple if statements in this scope
-        while self.graph.has_node(if_node):
+        while self.has_node(if_node):
             i += 1
             if_st = "if" + str(i)
-            if_node = IfNode(os.path.join(base, if_st))
+            if_node = IfNode(f"{base}{_SEP}{if_st}")
 
         # edge (u,v): "u defines if statement v"
-        self.graph.add_edge(self.starting_node, if_node,
-                            edge=edge.DefinitionEdge(""))
+        self.add_edge(self.starting_node, if_node,
+                      edge.DefinitionEdge(""))
 
         # node.test - draw VariableEdge if depends on some variable
         self.change_scope(if_node, node.test)
@@ -457,6 +821,28 @@ class NodeMaker(ast.NodeVisitor):
                 self.starting_node = old_scope
 
 
+# key of graph.graph holding the FileNodes while the relationships are built
+_FILE_NODES = "_file_nodes"
+
+
+def _file_nodes(graph):
+    """
+    Lists the FileNode objects of ``graph``. While ``create_all_relationships``
+    runs, the list is kept in ``graph.graph`` so every pass shares one scan.
+
+    :param graph: the graph representing the target repo
+    :type graph: networkx.MultiDiGraph
+
+    :return: the nodes representing Python files, in the order of ``graph.nodes``
+    :rtype: FileNode list
+    """
+    files = graph.graph.get(_FILE_NODES)
+    if files is None:
+        files = [n for n in graph.nodes if type(n) is FileNode]
+
+    return files
+
+
 def get_repo_node_helper(graph, starting_node, mod, level):
     """
     Helper for get_repo_node which searches for relative imports.
@@ -476,38 +862,193 @@ def get_repo_node_helper(graph, starting_node, mod, level):
     :return: FileNode object associated with ``mod``
     :rtype: FileNode
     """
-    # print(f"relative for {mod}")
-    # for relative imports, go up in directories according to level
+    target_node = _parent_package(graph, starting_node, level)
+    if target_node is None:
+        return None
+
+    return _search_package(graph, target_node, mod)
+
+
+def _parent_package(graph, starting_node, level):
+    """
+    Gives the node ``level`` directories above ``starting_node``, which is the
+    package a relative import of that level is resolved from.
+
+    :param graph: the graph representing the target repo
+    :type graph: networkx.MultiDiGraph
+
+    :param starting_node: the node to start from
+    :type starting_node: Node
+
+    :param level: the number of directories to go up
+    :type level: int
+
+    :return: the node of the package, or None if it is above the top directory
+    :rtype: FolderNode
+    """
+    pred = graph._pred
     target_node = starting_node
     while (level != 0):
         # each node only has one direct predeccesor
-        target_node = list(graph.predecessors(target_node))[0]
+        parents = pred[target_node]
+        if not parents:
+            return None  # the import goes above the top directory
+        target_node = next(iter(parents))
         level -= 1
 
-    # after reaching top directory, search successors recursively for target
-    for node, succesors in nx.bfs_successors(graph, target_node):
-        # need to match last parts of each node name exactly
+    return target_node
+
 
-        # -index is the number of parts to match with. for example, to search for
-        # mod 'apply.core', we need to match [apply], [core] (or [apply], [core.py])
-        index = -len(mod.split("."))
+def _search_package(graph, target_node, mod):
+    """
+    Searches the successors of ``target_node`` breadth first for the module
+    ``mod``.
+
+    :param graph: the graph representing the target repo
+    :type graph: networkx.MultiDiGraph
+
+    :param target_node: the package the module is imported from
+    :type target_node: Node
+
+    :param mod: the name of the target Python module, or None to import the
+        package itself
+    :type mod: str
+
+    :return: the node associated with ``mod``, or None if it was not found
+    :rtype: Node
+    """
+    # 'from . import x' names no module, only the package it imports from
+    if mod is None:
+        return target_node
+
+    # need to match last parts of each node name exactly. for example, to search
+    # for mod 'apply.core', we need to match (apply, core) or (apply, core.py)
+    mod_folder = tuple(mod.split("."))
+    mod_file = mod_folder[:-1] + (mod_folder[-1] + ".py",)
+    index = -len(mod_folder)
+
+    # after reaching top directory, search successors breadth first for target
+    adj = graph._adj
+    seen = {target_node}
+    queue = deque([target_node])
+    while queue:
+        node = queue.popleft()
 
         # get the last parts of the current node
-        n = node.get_name().split(os.sep)[index:]
+        n = node.path_parts[index:]
+        if n == mod_folder or n == mod_file:
+            return node
+
+        for child in adj[node]:
+            if child not in seen:
+                seen.add(child)
+                queue.append(child)
+
+    return None
+
+
+def _package_index(graph, target_node):
+    """
+    Searches the successors of ``target_node`` breadth first once, and indexes
+    every node reached by the last part of its name, with a trailing '.py'
+    dropped. Each name maps to its nodes in the order they were reached, so that
+    ``_package_lookup`` can find any module as ``_search_package`` would.
+
+    :param graph: the graph representing the target repo
+    :type graph: networkx.MultiDiGraph
+
+    :param target_node: the package modules are imported from
+    :type target_node: Node
+
+    :return: a dictionary mapping the last part of names to nodes
+    :rtype: dict {str : Node list}
+
+    For a package 'apply' containing only the file 'core.py':
+    >>> _package_index(graph, FolderNode('labeling\\apply'))
+    {'apply': [<FolderNode>], 'core': [<FileNode>]}
+    """
+    index = {}
+    adj = graph._adj
+    seen = {target_node}
+    queue = deque([target_node])
+    while queue:
+        node = queue.popleft()
+
+        last = node.short_name
+        if last.endswith(".py"):
+            last = last[:-3]
+        nodes = index.get(last)
+        if nodes is None:
+            index[last] = [node]
+        else:
+            nodes.append(node)
+
+        for child in adj[node]:
+            if child not in seen:
+                seen.add(child)
+                queue.append(child)
+
+    return index
+
+
+def _package_lookup(package_index, mod):
+    """
+    Finds the module ``mod`` in an index created by ``_package_index``.
 
-        # make folder and file version of module. Ex. the folder apply/core or the
-        # file apply/core.py
-        mod_folder = mod.split(".")[index:]
-        mod_file = mod.split(".")[index:-1] + \
-            [(mod.split(".")[-1] + ".py")]
+    :param package_index: the index of the package the module is imported from
+    :type package_index: dict {str : Node list}
+
+    :param mod: the name of the target Python module
+    :type mod: str
+
+    :return: the first node reached whose name ends with ``mod``, or None
+    :rtype: Node
+    """
+    mod_parts = tuple(mod.split("."))
+    index = -len(mod_parts)
+    parents = mod_parts[:-1]
 
-        if n == mod_folder or n == (mod_file):
+    # the last part already matches, so only the parts before it are compared
+    for node in package_index.get(mod_parts[-1], ()):
+        if node.path_parts[index:-1] == parents:
             return node
-    
+
     return None
 
 
-def get_repo_node(graph: nx.MultiDiGraph, starting_node, mod, level):
+def _build_module_index(graph):
+    """
+    Creates an index from every trailing part of a node's name to the first node
+    (in the order of ``graph.nodes``) whose name ends with that part. File names
+    are also indexed without their ``.py`` extension, so a module name with its
+    dots replaced by separators can be looked up directly.
+
+    :param graph: the graph representing the target repo
+    :type graph: networkx.MultiDiGraph
+
+    :return: a dictionary mapping the name suffixes to Node objects
+    :rtype: dict {str : Node}
+
+    For a graph containing only the FileNode 'snorkel/labeling/apply/core.py':
+    >>> _build_module_index(graph)
+    {'snorkel/labeling/apply/core.py': <FileNode>, 'snorkel/labeling/apply/core': <FileNode>,
+     'labeling/apply/core.py': <FileNode>, ..., 'core.py': <FileNode>, 'core': <FileNode>}
+    """
+    index = {}
+
+    for node in graph.nodes:
+        parts = node.get_name().split(os.sep)
+        for i in range(len(parts)):
+            suffix = os.sep.join(parts[i:])
+            index.setdefault(suffix, node)
+            if suffix.endswith(".py"):
+                index.setdefault(suffix[:-3], node)
+
+    return index
+
+
+def get_repo_node(graph: nx.MultiDiGraph, starting_node, mod, level, index=None,
+                  cache=None):
     """
     Finds the FileNode object associated with the module name ``mod``, if any.
 
@@ -523,50 +1064,129 @@ def get_repo_node(graph: nx.MultiDiGraph, starting_node, mod, level):
     :param level: the level of the relative import (level=0 means an absolute import)
     :type level: int
 
+    :param index: the index created by ``_build_module_index(graph)``. Created
+        on the fly if not given, so callers resolving many imports should pass it.
+    :type index: dict {str : Node}
+
+    :param cache: a dictionary remembering the ``_package_index`` of each
+        package relative imports were resolved from
+    :type cache: dict {Node : dict}
+
     :return: FileNode object associated with ``mod``
     :rtype: FileNode
     """
     if level == 0:
         # for absolute imports, search to see if module in graph
-        target_node_name = mod.replace('.', os.sep)
-        for node in graph.nodes:
-            n = node.get_name()
-            if n.endswith(target_node_name) or n.endswith(target_node_name + ".py"):
-                return node
-        return None
+        if index is None:
+            index = _build_module_index(graph)
+        return index.get(mod.replace('.', os.sep))
     else:
-        return get_repo_node_helper(graph, starting_node, mod, level)
+        if cache is None:
+            return get_repo_node_helper(graph, starting_node, mod, level)
+
+        target_node = _parent_package(graph, starting_node, level)
+        if target_node is None:
+            return None
+
+        # 'from . import x' names no module, only the package it imports from
+        if mod is None:
+            return target_node
+
+        # files in the same package share one search of it
+        package_index = cache.get(target_node)
+        if package_index is None:
+            package_index = cache[target_node] = _package_index(graph, target_node)
+        return _package_lookup(package_index, mod)
 
 
-def import_relationship(graph: nx.MultiDiGraph):
+def import_relationship(graph: nx.MultiDiGraph, index=None, cache=None):
     """
     Creates a directed edge for when a module imports another module from the
-    target code repo.
+    target code repo. A module imported several times by the same module gets
+    a single edge, so edge counts (and the adjacency matrices built from them)
+    count importing modules, not import statements.
 
     :param graph: the tree representing the target code repo
     :type graph: networkx.MultiDiGraph
+
+    :param index: the index created by ``_build_module_index(graph)``, if already
+        computed
+    :type index: dict {str : Node}
+
+    :param cache: the relative import cache of ``get_repo_node``, to share its
+        lookups with other passes over ``graph``
+    :type cache: dict {Node : dict}
+
+    :return: the result of ``imports_dict(graph)``, found from the same lookups
+        as the edges
+    :rtype: dict {Node : Node list}
     """
-    node_visitor = ImportLister()
     imports = []
+    seen = set()
+    if index is None:
+        index = _build_module_index(graph)
+    if cache is None:
+        cache = {}
+    # (file, imported node, imported names) of every ImportFrom statement
+    from_imports = []
 
     # collect all edges to be added
-    for node in graph.nodes:
-        if type(node) is FileNode:  # if at Python file
-            node_visitor.visit(node.get_ast())
-
-            # add every import that is from within the repo
-            for (name, level) in node_visitor.imported_mods:
-                imported_node = get_repo_node(graph, node, name, level)
-                if imported_node is not None:  # if exists
-                    # edge (u,v): "u is imported by v"
-                    imports.append((imported_node, node, {
-                                   'edge': edge.ImportEdge("")}))
-
-            node_visitor.reset()
+    for node in _file_nodes(graph):
+        summary = get_summary(node)
+
+        # add every import that is from within the repo, once per pair of nodes
+        for (name, level) in summary.imported_mods:
+            imported_node = get_repo_node(
+                graph, node, name, level, index, cache)
+            if imported_node is None:
+                continue
+            if (imported_node, node) not in seen:
+                seen.add((imported_node, node))
+                # edge (u,v): "u is imported by v"
+                imports.append((imported_node, node, {
+                               'edge': edge.ImportEdge("")}))
+            funcs = summary.imported_funcs.get(name)
+            if funcs is not None:
+                from_imports.append((node, imported_node, funcs))
 
     # add collected edges
     graph.add_edges_from(imports)
 
+    # the imported functions are searched for once the edges are in place, as
+    # imports_dict() would
+    return _import_dict(graph, from_imports)
+
+
+def _import_dict(graph, from_imports):
+    """
+    Gives the dictionary of imported functions described by ``from_imports``.
+
+    :param graph: the tree representing the target code repo
+    :type graph: networkx.MultiDiGraph
+
+    :param from_imports: the file, imported node and imported names of each
+        ImportFrom statement, in the order of the files
+    :type from_imports: (Node, Node, str list) list
+
+    :return: the dictionary described in ``imports_dict()``
+    :rtype: dict {Node : Node list}
+    """
+    import_dict = {node: [] for node in _file_nodes(graph)}
+    # the same names are often imported from the same module by many files
+    func_cache = {}
+
+    for (node, imported_node, funcs) in from_imports:
+        key = (imported_node, frozenset(funcs))
+        func_nodes = func_cache.get(key)
+        if func_nodes is None:
+            func_nodes = func_cache[key] = get_func_nodes(
+                graph, imported_node, key[1])
+        import_dict[node] += func_nodes
+
+    # a node imported by several statements is only listed once
+    return {node: list(dict.fromkeys(imports))
+            for node, imports in import_dict.items()}
+
 
 # return a list of nodes corresponding to functions in a module
 def get_func_nodes(graph, parent_node, n_list):
@@ -582,93 +1202,113 @@ def get_func_nodes(graph, parent_node, n_list):
     :param n_list: the list of names of the nodes
     :type n_list: str list
 
-    :return: the list of Node objects
+    :return: the list of Node objects, without duplicates, in the order they
+        were found in
     :rtype: Node list
     """
-    nodes = set()
+    # a dict rather than a set keeps the order of the nodes independent of
+    # string hashing, which changes between runs
+    nodes = {}
 
     if type(parent_node) is FileNode:
-        for node in graph.successors(parent_node):
-            for target_name in n_list:
-                n_name = node.get_name().split(os.sep)[-1]
-                if n_name == target_name:
-                    nodes.add(node)
+        for node in graph._adj[parent_node]:
+            n_name = node.short_name
+            if n_name in n_list:
+                nodes[node] = None
     elif type(parent_node) is FolderNode:
-        for node in graph.successors(parent_node):
-            nodes = nodes.union(get_func_nodes(graph, node, n_list))
+        for node in graph._adj[parent_node]:
+            nodes.update(dict.fromkeys(get_func_nodes(graph, node, n_list)))
 
     return list(nodes)
 
 
-def imports_dict(graph):
+def imports_dict(graph, index=None, cache=None):
     """
     Creates a dictionary of imported functions.
 
     :param graph: the tree representing the target code repo
     :type graph: networkx.MultiDiGraph
 
+    :param index: the index created by ``_build_module_index(graph)``, if already
+        computed
+    :type index: dict {str : Node}
+
+    :param cache: the relative import cache of ``get_repo_node``, to share its
+        lookups with other passes over ``graph``
+    :type cache: dict {Node : dict}
+
     :returns: A dictionary mapping the name of a Python file to a list of all 
-    modules it imports from its own repo, which is represented by `graph`.
+    modules it imports from its own repo, which is represented by `graph`. Each
+    imported node is listed once.
     :rtype: dict {str : str list}
     """
-    import_dict = {}
-    node_visitor = ImportLister()
-
-    for node in graph.nodes:
-        if type(node) is FileNode:  # if at Python file
-            node_visitor.visit(node.get_ast())
-
-            imports = []
-           #print(f'Node {node}:')
-            for (name, level) in node_visitor.imported_mods:
-                imported_node = get_repo_node(graph, node, name, level)
-                if imported_node is not None:
-                    try:
-                        funcs = node_visitor.imported_funcs[name]
-                        imports += get_func_nodes(graph, imported_node, funcs)
-                    except KeyError:
-                        pass  # Import statements do not have associated functions
-                        # like ImportFrom statements
-
-            import_dict.update({node: imports})
-
-            node_visitor.reset()
-
-    return import_dict
-
-
-def function_call_relationship(graph: nx.MultiDiGraph):
+    if index is None:
+        index = _build_module_index(graph)
+    if cache is None:
+        cache = {}
+
+    from_imports = []
+    for node in _file_nodes(graph):
+        summary = get_summary(node)
+
+        for (name, level) in summary.imported_mods:
+            # Import statements do not have associated functions like
+            # ImportFrom statements
+            funcs = summary.imported_funcs.get(name)
+            if funcs is None:
+                continue
+            imported_node = get_repo_node(
+                graph, node, name, level, index, cache)
+            if imported_node is not None:
+                from_imports.append((node, imported_node, funcs))
+
+    return _import_dict(graph, from_imports)
+
+
+def function_call_relationship(graph: nx.MultiDiGraph, import_dict=None):
     """
     Creates a directed edge for when a module calls a function from another module
-    from the target code repo.
+    from the target code repo. A function called several times by the same
+    module gets a single edge, so edge counts (and the adjacency matrices built
+    from them) count calling modules, not calls.
 
     :param graph: the graph representing the target code repo
     :type graph: networkx.MultiDiGraph
+
+    :param import_dict: the result of ``imports_dict(graph)``, if already computed
+    :type import_dict: dict {str : str list}
     """
-    import_dict = imports_dict(graph)
-    node_visitor = CallLister()
+    if import_dict is None:
+        import_dict = imports_dict(graph)
     func_edges = []
 
-    for node in graph.nodes:
-        if type(node) is FileNode:
-            node_visitor.visit(node.get_ast())
+    for node in _file_nodes(graph):
+        summary = get_summary(node)
+
+        # group the imported nodes by the name they would be called with
+        imported_by_name = {}
+        for imported_func in import_dict[node]:
+            n = imported_func.short_name
+            imported_by_name.setdefault(n, []).append(imported_func)
 
-            for func in node_visitor.calls:
-                for imported_func in import_dict[node]:
-                    # get full function name as it would be called in code
-                    n = imported_func.get_name().split(os.sep)[-1]
-                    if n == func:
-                        # edge (u,v): "u is called by v"
-                        func_edges.append(
-                            (imported_func, node, {'edge': edge.FunctionCallEdge("")}))
+        # nothing this file calls can be from the repo
+        if not imported_by_name:
+            continue
 
-            node_visitor.reset()
+        # a function called several times only gets one edge, so each distinct
+        # name is looked up once, in the order of the first call. the imported
+        # nodes have no duplicates, so neither do the edges
+        for func in dict.fromkeys(summary.calls):
+            for imported_func in imported_by_name.get(func, ()):
+                # edge (u,v): "u is called by v"
+                func_edges.append(
+                    (imported_func, node, {'edge': edge.FunctionCallEdge("")}))
 
     # add collected edges
     graph.add_edges_from(func_edges)
 
 
-def inheritance_relationship_class_helper(classes, graph, node, node_visitor):
+def inheritance_relationship_class_helper(classes, graph, node, summary):
     """
     Helper for inheritance_relationship() that generates a list of ClassNode objects.
 
@@ -678,103 +1318,145 @@ def inheritance_relationship_class_helper(classes, graph, node, node_visitor):
     :param node: the current node in the graph
     :type node: networkx.node
 
-    :param node_visitor: the type of nodes that are visited
-    :type node_visitor: ClassLister()
+    :param summary: the summary of the Python file represented by ``node``
+    :type summary: FileSummary
 
     :return: a list of nodes representing the classes in the repo
     :rtype: node.Node list
     """
 
     for c in graph.successors(node):
-        n = c.get_name().split(os.sep)[-1]
-        if n in node_visitor.classes:
+        n = c.short_name
+        if n in summary.classes:
             classes.append(c)
 
 
-def inheritance_relationship(graph: nx.MultiDiGraph):
+def inheritance_relationship(graph: nx.MultiDiGraph, import_dict=None):
     """
     Creates a directed edge for whenever a class definition subclasses another class
     from the target code repo.
 
     :param graph: the graph representing the target code repo
     :type graph: networkx.MultiDiGraph
+
+    :param import_dict: the result of ``imports_dict(graph)``, if already computed
+    :type import_dict: dict {str : str list}
     """
-    import_dict = imports_dict(graph)
-    node_visitor = ClassLister()
+    if import_dict is None:
+        import_dict = imports_dict(graph)
     inherit_edges = []
 
-    for node in graph.nodes:
-        if type(node) is FileNode:  # if at Python file
-            node_visitor.visit(node.get_ast())
-
-            imported_classes = [n
-                                for n in import_dict[node] if type(n) is ClassNode]
-
-            # gather the ClassNodes defined in this class
-            defined_nodes = []
-            inheritance_relationship_class_helper(defined_nodes, graph, node, node_visitor)
-
-            for defined_class in defined_nodes:
-                defined_class_name = str(defined_class).split(os.sep)[-1]
-
-                for base_class in node_visitor.extends[defined_class_name]:
-                    # check if the base class was imported or defined within the
-                    # same file
-                    e = ()
-                    all_classes = imported_classes + defined_nodes
-                    for c in all_classes:
-                        class_name = str(c).split(os.sep)[-1]
-                        if base_class == class_name:
-                            e = (c, defined_class,
-                                 {'edge': edge.InheritanceEdge("")})
-                            break
-
-                    # if class was found, add inheritance edge
-                    if e != ():
-                        inherit_edges.append(e)
-
-            node_visitor.reset()
+    for node in _file_nodes(graph):
+        summary = get_summary(node)
+
+        imported_classes = [n
+                            for n in import_dict[node] if type(n) is ClassNode]
+
+        # gather the ClassNodes defined in this class
+        defined_nodes = []
+        inheritance_relationship_class_helper(defined_nodes, graph, node, summary)
+
+        # map each class name to the first class with that name imported into,
+        # and defined within, this file
+        import_index = {}
+        for c in imported_classes:
+            import_index.setdefault(c.short_name, c)
+        class_index = {}
+        for c in defined_nodes:
+            class_index.setdefault(c.short_name, c)
+
+        extends = summary.extends
+        for defined_class in defined_nodes:
+            for base_class in extends.get(defined_class.short_name, ()):
+                # classes defined in the file shadow imported ones, except that
+                # a class cannot extend itself, as in 'class A(A)', where the
+                # base is the imported class being wrapped
+                c = class_index.get(base_class)
+                if c is None or c is defined_class:
+                    c = import_index.get(base_class)
+
+                # if class was found, add inheritance edge
+                if c is not None:
+                    inherit_edges.append(
+                        (c, defined_class, {'edge': edge.InheritanceEdge("")}))
 
     # add collected edges
     graph.add_edges_from(inherit_edges)
 
 
-def add_graph_nodes(graph):
+def add_graph_nodes(graph, copy=True):
     """
-    Adds ClassNode, FuncNode, and VarNode to the base ``graph``.
+    Adds ClassNode, FuncNode, and VarNode to a copy of the base ``graph``.
 
     :param graph: the graph representing the target code repo
     :type graph: networkx.MultiDiGraph
+
+    :param copy: whether to add the nodes to a copy of ``graph``. Callers that
+        no longer need the base graph can pass False to modify it in place.
+    :type copy: bool
+
+    :return: the copy of ``graph`` (or ``graph`` itself) with the new nodes added
+    :rtype: networkx.MultiDiGraph
     """
-    node_visitor = NodeMaker(graph)
+    # copy the graph once to make sure original data is preserved
+    node_visitor = NodeMaker(graph.copy() if copy else graph)
 
-    for node in graph.nodes:
-        if type(node) is FileNode:  # if at Python file
-            node_visitor.starting_node = node
-            node_visitor.visit(node.get_ast())
-            # definitionLister already adds the edges
+    for node in _file_nodes(graph):
+        node_visitor.starting_node = node
+        node_visitor.visit(node.get_ast())
+
+    # add collected edges
+    node_visitor.graph.add_edges_from(node_visitor._pending_edges)
 
     return node_visitor.graph
 
 
-def create_all_relationships(graph):
+def create_all_relationships(graph, max_workers=1, copy=True):
     """
     Adds all available relationship edges and nodes to ``graph``.
 
     :param graph: the graph to add the relationships to.
     :type graph: networkx.MultiDiGraph
 
+    :param max_workers: the number of worker processes used to walk the ASTs of
+        the files, or None for the number of CPUs. Defaults to 1, which walks
+        them in this process.
+    :type max_workers: int
+
+    :param copy: whether to leave ``graph`` unchanged and add the relationships to
+        a copy of it. Callers that are done with ``graph`` can pass False.
+    :type copy: bool
+
     :return: the graph with all relationships added
     :rtype: networkx.MultiDiGraph
     """
-    new_graph = add_graph_nodes(graph)
-    import_relationship(new_graph)
-    function_call_relationship(new_graph)
-    inheritance_relationship(new_graph)
+    new_graph = add_graph_nodes(graph, copy)
+
+    # only edges are added from here on, so the FileNodes and the module index
+    # found now stay valid for every pass
+    new_graph.graph[_FILE_NODES] = _file_nodes(new_graph)
+    try:
+        # walking the ASTs is the only per-file work heavy enough to be worth
+        # sending to other processes; the passes below are dict lookups
+        summarize_files(_file_nodes(new_graph), max_workers)
+        index = _build_module_index(new_graph)
+        cache = {}
+        # every import is resolved once, for both the import edges and the
+        # imported functions used by the passes below
+        import_dict = import_relationship(new_graph, index, cache)
+        function_call_relationship(new_graph, import_dict)
+        inheritance_relationship(new_graph, import_dict)
+    finally:
+        # not stored with the graph, where it could go stale
+        del new_graph.graph[_FILE_NODES]
 
     return new_graph
 
 
+# the characters wrapped around node names by graph_to_string()
+_WRAP = {ClassNode: ("[", "]"), FuncNode: ("(", ")"), VarNode: ("$", "$")}
+
+
 def graph_to_string(graph: nx.MultiDiGraph, starting_node, level=0):
     """
     String representation of `graph` for debugging purposes.
@@ -788,25 +1470,46 @@ def graph_to_string(graph: nx.MultiDiGraph, starting_node, level=0):
     '   (func1)'
     '   [A] (func2) (func3)'
     '   [B]'
+
+    A node reached through a cycle is listed, but its children are not listed
+    again below it.
     """
-    abrev_name = str(starting_node).split(os.sep)[-1]
-    if type(starting_node) is ClassNode:
-        abrev_name = "[" + abrev_name + "]"
-    elif type(starting_node) is FuncNode:
-        abrev_name = "(" + abrev_name + ")"
-    elif type(starting_node) is VarNode:
-        abrev_name = "$" + abrev_name + "$"
-    st = abrev_name
-    level += 1
-    if not (type(starting_node) is VarNode):
-        for child in graph.successors(starting_node):
+    out = []
+    # the nodes from the starting node down to the node being listed
+    on_path = set()
+    adj = graph._adj
+
+    # each entry is a node, its level, and the text placed before its name. An
+    # entry with no level marks that all children of its node are listed.
+    stack = [(starting_node, level, "")]
+    while stack:
+        node, level, prefix = stack.pop()
+        if level is None:
+            on_path.discard(node)
+            continue
+
+        node_type = type(node)
+        left, right = _WRAP.get(node_type, ("", ""))
+        out.append(prefix + left + node.short_name + right)
+
+        # only a node already on the path leads to a cycle; a node reached
+        # again through another path (graphs are DAGs) is listed in full
+        if node_type is VarNode or node in on_path:
+            continue
+        on_path.add(node)
+        stack.append((node, None, None))
+
+        # push children in reverse so they are popped in graph order
+        level += 1
+        indent = "\n" + " "*3*level
+        for child in reversed(list(adj[node])):
             # if children nodes arent class functions
-            if (type(child) is FuncNode and type(starting_node) is ClassNode):
-                st += " " + graph_to_string(graph, child, level)
+            if (type(child) is FuncNode and node_type is ClassNode):
+                stack.append((child, level, " "))
             else:
-                st += "\n" + " "*3*level + graph_to_string(graph, child, level)
+                stack.append((child, level, indent))
 
-    return st
+    return "".join(out)
 
 
 def graph_to_json(graph: nx.MultiDiGraph):
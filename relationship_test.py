@@ -3,13 +3,50 @@ File for testing relationship.py module.
 """
 import os
 import ast
-import Node
+import node
 import edge
 import parsing
 import relationship
 import networkx as nx
 import pytest
 
+# Find absolute current directory path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+### File structure for test repo ###
+# get ast of test Python files
+with open(os.path.join(current_dir, "test_repo", "c.py")) as f:
+    c_ast = ast.parse(f.read())
+
+c_file_node = node.FileNode(os.path.join("test_repo", "c.py"), c_ast)
+
+# the graph of the whole test repo, with all relationships
+repo_graph = relationship.create_all_relationships(parsing.create_ast_graph(
+    ["a/a.py", "b.py", "c.py"], os.path.join(current_dir, "test_repo"),
+    "test_repo"), max_workers=1)
+
+
+def code_graph(files):
+    """
+    Gives the graph, with all relationships, of a repo named 'repo' holding the
+    Python files in ``files``, a dict mapping paths (with '/') to their code.
+    """
+    g = nx.MultiDiGraph()
+    g.add_node(node.FolderNode("repo"))
+    for path, code in files.items():
+        parsing.create_branch(g, ["repo"] + path.split("/"), ast.parse(code))
+    return relationship.create_all_relationships(g, max_workers=1)
+
+
+def edges_of_type(g, edge_type):
+    """
+    Gives the (source, target) names of the edges of ``g`` of type ``edge_type``,
+    with os.sep replaced by '/'.
+    """
+    return sorted((u.name.replace(os.sep, "/"), v.name.replace(os.sep, "/"))
+                  for u, v, e in g.edges(data="edge") if type(e) is edge_type)
+
+
 # @pytest.mark.parametrize("fn, children", [
 #     (fold_test_repo, [fold_a, file_b]),
 #     (fold_a, [file_a])
@@ -18,3 +55,199 @@ import pytest
 #     for child in children:
 #         assert child.parent == fn.name
 #     assert fn.children == children
+
+
+# test get_summary()
+def test_get_summary():
+    summary = relationship.get_summary(c_file_node)
+    assert summary.imported_mods == [("b", 1)]
+    assert summary.calls == ["b_func"]
+    assert summary.classes == {"ClassC"}
+    assert summary.extends == {"ClassC": []}
+    # the AST is only walked once
+    assert relationship.get_summary(c_file_node) is summary
+
+
+# test analyze() with base classes given as attributes
+@pytest.mark.parametrize("code, extends", [
+    ("class A(B): pass", {"A": ["B"]}),
+    ("class A(mod.B): pass", {"A": ["mod"]}),
+    ("class A(pkg.mod.B): pass", {"A": []}),
+])
+def test_analyze_extends(code, extends):
+    assert relationship.analyze(ast.parse(code)).extends == extends
+
+
+# test collect_imports() finds imports in nested blocks, in source order
+def test_collect_imports():
+    code = ("import a\n"
+            "def f():\n"
+            "    from b import x as y\n"
+            "try:\n"
+            "    import c\n"
+            "except ImportError:\n"
+            "    from . import d\n")
+    mods, funcs = relationship.collect_imports(ast.parse(code))
+    assert mods == [("a", 1), ("b", 0), ("c", 1), (None, 1)]
+    assert funcs == {"b": ["y"], None: ["d"]}
+
+    # the blocks of a try statement are searched in source order, so the last
+    # import from a module wins as it does in analyze()
+    code = ("try:\n"
+            "    from m import a\n"
+            "except ImportError:\n"
+            "    from m import b\n"
+            "else:\n"
+            "    from n import x\n"
+            "finally:\n"
+            "    from m import c\n")
+    tree = ast.parse(code)
+    mods, funcs = relationship.collect_imports(tree)
+    assert mods == [("m", 0), ("m", 0), ("n", 0), ("m", 0)]
+    assert funcs == {"m": ["c"], "n": ["x"]}
+    assert relationship.analyze(tree).imported_funcs == funcs
+
+
+# test collect_imports() looks into with and match blocks, but not expressions
+def test_collect_imports_blocks():
+    code = ("with open('f') as f:\n"
+            "    import a\n"
+            "match f:\n"
+            "    case 1:\n"
+            "        import b\n"
+            "x = lambda: __import__('c')\n")
+    mods, funcs = relationship.collect_imports(ast.parse(code))
+    assert mods == [("a", 1), ("b", 1)]
+    assert funcs == {}
+
+
+# test the single listers on a whole module
+def test_listers():
+    call_lister = relationship.CallLister()
+    call_lister.visit(c_ast)
+    assert call_lister.calls == ["b_func"]
+
+    class_lister = relationship.ClassLister()
+    class_lister.visit(c_ast)
+    assert class_lister.classes == ["ClassC"]
+    assert class_lister.extends == {"ClassC": []}
+
+    import_lister = relationship.ImportLister()
+    import_lister.visit(c_ast)
+    assert import_lister.imported_mods == [("b", 1)]
+
+    # reset() starts new lists, so the results already taken are kept
+    calls, classes, mods = call_lister.calls, class_lister.classes, import_lister.imported_mods
+    call_lister.reset()
+    class_lister.reset()
+    import_lister.reset()
+    assert (call_lister.calls, class_lister.classes, import_lister.imported_mods) == ([], [], [])
+    assert (calls, classes, mods) == (["b_func"], ["ClassC"], [("b", 1)])
+
+
+# test graph_to_string() lists a node reached through several paths in full
+# each time
+def test_graph_to_string():
+    expected = ("test_repo\n"
+                "   a\n"
+                "      a.py\n"
+                "         $a$\n"
+                "         (a_func)\n"
+                "            $inside_a_func$\n"
+                "   b.py\n"
+                "      $b$\n"
+                "      (b_func)\n"
+                "         $inside_b_func$\n"
+                "         a.py\n"
+                "            $a$\n"
+                "            (a_func)\n"
+                "               $inside_a_func$\n"
+                "      a.py\n"
+                "         $a$\n"
+                "         (a_func)\n"
+                "            $inside_a_func$\n"
+                "      c.py\n"
+                "         $c$\n"
+                "         [ClassC]\n"
+                "            $inside_ClassC_1$\n"
+                "            $inside_ClassC_2$ (c_func)\n"
+                "               $inside_c_func$\n"
+                "   c.py\n"
+                "      $c$\n"
+                "      [ClassC]\n"
+                "         $inside_ClassC_1$\n"
+                "         $inside_ClassC_2$ (c_func)\n"
+                "            $inside_c_func$")
+    root = node.FolderNode("test_repo")
+    assert relationship.graph_to_string(repo_graph, root) == expected
+
+
+# test graph_to_string() does not list the children of a node again below itself
+def test_graph_to_string_cycle():
+    g = nx.MultiDiGraph()
+    f = node.FileNode("f.py", None)
+    x = node.FuncNode(os.path.join("f.py", "x"), None)
+    y = node.FuncNode(os.path.join("f.py", "y"), None)
+    g.add_edge(f, x, edge=edge.DefinitionEdge(""))
+    g.add_edge(x, y, edge=edge.FunctionCallEdge(""))
+    g.add_edge(y, x, edge=edge.FunctionCallEdge(""))
+    assert relationship.graph_to_string(g, f) == "f.py\n   (x)\n      (y)\n         (x)"
+
+
+# test inheritance_relationship() prefers a class defined in the same file to an
+# imported one, except for the class being defined
+@pytest.mark.parametrize("code, edges", [
+    # a local class shadows the imported one
+    ("from m import A\nclass A: pass\nclass B(A): pass",
+     [("repo/s.py/A", "repo/s.py/B")]),
+    # the base of 'class A(A)' is the imported class it wraps
+    ("from m import A\nclass A(A): pass",
+     [("repo/m.py/A", "repo/s.py/A")]),
+    # a class extending a name found nowhere gets no edge, not a self-loop
+    ("class C(C): pass", []),
+])
+def test_inheritance_shadowing(code, edges):
+    g = code_graph({"m.py": "class A: pass", "s.py": code})
+    assert edges_of_type(g, edge.InheritanceEdge) == edges
+
+
+# test a module imported twice and a function called twice each give one edge
+def test_repeated_imports_and_calls():
+    g = code_graph({"m.py": "def f(): pass",
+                    "s.py": "import m\nfrom m import f\nimport m\nf()\nf()"})
+    assert edges_of_type(g, edge.ImportEdge) == [("repo/m.py", "repo/s.py")]
+    assert edges_of_type(g, edge.FunctionCallEdge) == [("repo/m.py/f", "repo/s.py")]
+
+
+# test 'from . import x' joins the package and its file by both a directory and
+# an import edge, which the graph keeps as parallel edges of different types
+def test_parallel_edges():
+    g = code_graph({"pkg/x.py": "from . import y", "pkg/y.py": ""})
+    pkg = node.FolderNode(os.path.join("repo", "pkg"))
+    x = node.FileNode(os.path.join("repo", "pkg", "x.py"), None)
+
+    assert sorted(type(d['edge']).__name__ for d in g[pkg][x].values()) == \
+        ["DirectoryEdge", "ImportEdge"]
+    assert ("repo/pkg", "repo/pkg/x.py") in edges_of_type(g, edge.DirectoryEdge)
+    assert edges_of_type(g, edge.ImportEdge) == [("repo/pkg", "repo/pkg/x.py")]
+
+
+a_file = node.FileNode(os.path.join("test_repo", "a", "a.py"), None)
+b_file = node.FileNode(os.path.join("test_repo", "b.py"), None)
+
+
+# test get_repo_node() resolves 'from . import x' to the package it imports from,
+# and gives None for relative imports above the top of the repo, with and
+# without a cache of packages
+@pytest.mark.parametrize("start, mod, level, expected", [
+    (a_file, None, 1, node.FolderNode(os.path.join("test_repo", "a"))),
+    (a_file, None, 2, node.FolderNode("test_repo")),
+    (a_file, "b", 2, b_file),
+    (a_file, None, 3, None),
+    (b_file, "a", 2, None),
+    (b_file, None, 5, None),
+])
+@pytest.mark.parametrize("cache", [None, {}])
+def test_get_repo_node_relative(start, mod, level, expected, cache):
+    assert relationship.get_repo_node(
+        repo_graph, start, mod, level, cache=cache) == expected
@@ -39,6 +39,10 @@ EDGES = {
     "Definition": edge.DefinitionEdge
 }
 
+# the preferences read from the ``config`` file, once it has been read
+_preferences = None
+
+
 def get_preferences():
     """
     Finds and retrieves preferences from the ``config`` file.
@@ -49,13 +53,19 @@ def get_preferences():
     >>> get_preferences()
     (['Folder', 'File'], ['Directory'])
     """
-    # potentially use path finding function from parsing.py
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    global _preferences
+
+    if _preferences is None:
+        # potentially use path finding function from parsing.py
+        current_dir = os.path.dirname(os.path.abspath(__file__))
 
-    with open(os.path.join(current_dir, "config.json"), "r") as f:
-        config = json.load(f)
+        with open(os.path.join(current_dir, "config.json"), "r") as f:
+            config = json.load(f)
 
-    return (config["nodes"], config["edges"])
+        _preferences = (tuple(config["nodes"]), tuple(config["edges"]))
+
+    # copies, so that callers cannot change the cached preferences
+    return (list(_preferences[0]), list(_preferences[1]))
 
 
 def str_to_node(str):
@@ -68,13 +78,15 @@ def str_to_node(str):
     :return: a node.Node object
     :rtype: node.Node
 
+    :raises ValueError: if ``str`` is not a key of ``NODES``
+
     >>> str_to_node("Folder")
     node.FolderNode
     """
     try:
-        return NODES.get(str)
+        return NODES[str]
     except KeyError:
-        raise ValueError(f"Node must be one of {NODES}")
+        raise ValueError(f"Node must be one of {list(NODES)}") from None
 
 
 def str_to_edge(str):
@@ -87,13 +99,15 @@ def str_to_edge(str):
     :return: a edge.Edge object
     :rtype: edge.Edge
 
+    :raises ValueError: if ``str`` is not a key of ``EDGES``
+
     >>> str_to_edge("Directory")
     edge.DirectoryEdge
     """
     try:
-        return EDGES.get(str)
+        return EDGES[str]
     except KeyError:
-        raise ValueError(f"Edge must be one of {EDGES}")
+        raise ValueError(f"Edge must be one of {list(EDGES)}") from None
 
 
 def subgraph(graph: nx.MultiDiGraph, nodes, edges):
@@ -120,25 +134,53 @@ def subgraph(graph: nx.MultiDiGraph, nodes, edges):
     """
     subgraph = nx.MultiDiGraph()
 
-    node_list = list(map(str_to_node, nodes))
-    edge_list = list(map(str_to_edge, edges))
+    node_types = frozenset(map(str_to_node, nodes))
+    edge_types = frozenset(map(str_to_edge, edges))
 
     # generate a list nodes in the subgraph
     sub_nodes = [(n, d)
-                 for n, d in graph.nodes(data=True) if type(n) in node_list]
+                 for n, d in graph.nodes(data=True) if type(n) in node_types]
 
-    # generate a list edges in the subgraph
+    # generate a list edges in the subgraph, leaving out edges to nodes that are
+    # not included so that they are never added
     sub_edges = [(start, end, edge_attribute)
                  for start, end, edge_attribute in graph.edges(data=True)
-                 if (type(edge_attribute['edge']) in edge_list)]
+                 if (type(edge_attribute['edge']) in edge_types
+                     and type(start) in node_types and type(end) in node_types)]
 
     # add all nodes and edges to the graph
     subgraph.add_nodes_from(sub_nodes)
     subgraph.add_edges_from(sub_edges)
 
-    # remove nodes not to be included
-    removes = [n for n in subgraph.nodes if type(n) not in node_list]
-    subgraph.remove_nodes_from(removes)
-
     return subgraph
 
+
+def subgraph_view(graph: nx.MultiDiGraph, nodes, edges):
+    """
+    Gives a read-only view of ``graph`` with only the chosen edge and node types,
+    like ``subgraph`` but without copying any nodes or edges. The view follows
+    later changes to ``graph`` and cannot be modified itself.
+
+    :param graph: the graph to view
+    :type graph: networkx.MultiDiGraph
+
+    :param nodes: the list of node types to include
+    :type nodes: str list
+
+    :param edges: the list of edge types to include
+    :type edges: str list
+
+    :return: the view of ``graph`` with the chosen edge and node types included
+    :rtype: nx.MultiDiGraph
+    """
+    node_types = frozenset(map(str_to_node, nodes))
+    edge_types = frozenset(map(str_to_edge, edges))
+    adj = graph._adj
+
+    def filter_node(n):
+        return type(n) in node_types
+
+    def filter_edge(u, v, k):
+        return type(adj[u][v][k]['edge']) in edge_types
+
+    return nx.subgraph_view(graph, filter_node=filter_node, filter_edge=filter_edge)
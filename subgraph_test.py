@@ -0,0 +1,72 @@
+"""
+File for testing subgraph.py module.
+"""
+import os
+import parsing
+import relationship
+import subgraph
+import metrics
+import pytest
+from visual import PRESETS
+
+# Find absolute current directory path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# the graph of the whole test repo, with all relationships
+repo_graph = relationship.create_all_relationships(parsing.create_ast_graph(
+    ["a/a.py", "b.py", "c.py"], os.path.join(current_dir, "test_repo"),
+    "test_repo"), max_workers=1)
+
+
+def edge_list(g):
+    """
+    Lists the edges of ``g`` with the type of each edge, in a fixed order.
+    """
+    return sorted((u.get_name(), v.get_name(), type(d['edge']).__name__)
+                  for u, v, d in g.edges(data=True))
+
+
+### subgraph Testing ###
+
+
+# the view has the same nodes and edges as the copy
+@pytest.mark.parametrize("preset", [
+    "file directory",
+    "import dependency",
+    "granular definitions",
+    "all",
+])
+def test_subgraph_view(preset):
+    p = PRESETS[preset]
+    copy = subgraph.subgraph(repo_graph, p.nodes, p.edges)
+    view = subgraph.subgraph_view(repo_graph, p.nodes, p.edges)
+
+    assert len(view) > 0
+    assert set(view.nodes) == set(copy.nodes)
+    assert edge_list(view) == edge_list(copy)
+
+
+# the view cannot be modified
+def test_subgraph_view_frozen():
+    p = PRESETS["all"]
+    view = subgraph.subgraph_view(repo_graph, p.nodes, p.edges)
+
+    with pytest.raises(Exception):
+        view.remove_node(next(iter(view.nodes)))
+
+
+### metrics Testing ###
+
+
+# commits with equal subgraphs are grouped, in the order they are first found
+def test_unique_subgraphs():
+    other = parsing.create_ast_graph(
+        ["b.py", "c.py"], os.path.join(current_dir, "test_repo"), "test_repo")
+    other = relationship.create_all_relationships(other, max_workers=1)
+    commit_dict = {"1": repo_graph, "2": other, "3": repo_graph}
+
+    pairs = metrics.unique_subgraphs(commit_dict, "file directory")
+
+    assert [sha1_list for _, sha1_list in pairs] == [["1", "3"], ["2"]]
+    assert set(pairs[0][0].nodes) == set(
+        subgraph.subgraph(repo_graph, ["Folder", "File"], ["Directory"]).nodes)
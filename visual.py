@@ -8,60 +8,75 @@ directory.
 The display function is heavily adapted from this user: https://github.com/xhlulu.
 """
 
-import dash
-import dash_cytoscape as cyto
-from dash.dependencies import Input, Output, State
-from dash.exceptions import PreventUpdate
-import dash_html_components as html
-import dash_core_components as dcc
-import dash_reusable_components as drc
-
-import plotly.express as px
-import pandas as pd
+# annotations are not evaluated, so redis is only imported for type checkers
+from __future__ import annotations
+
 from git.objects.commit import Commit
 import networkx as nx
 from networkx import MultiDiGraph
-import webbrowser as web
-import os
 import pickle
 from datetime import datetime
-import redis
 import math
+from functools import lru_cache
+from typing import NamedTuple, TYPE_CHECKING
+from bisect import bisect_left, bisect_right
+import os
+import weakref
 
 import subgraph
 import node
 import edge
 import metrics
-import matrix
+import pool
+
+if TYPE_CHECKING:
+    import redis
+
+# Dash, Plotly and SciPy (through the matrix module) are slow to import, and
+# only needed once the app is displayed or commits are analyzed. They are
+# imported in the functions that use them, so that modules such as metrics,
+# which only need the presets, can import this one cheaply.
 
 # for development purposes only. If True, the web browser refreshes whenever
 # chanegs are made to this file
 DEBUG_MODE = False
 
-# Graph presets. 'name' : ( [included_nodes], [included_edges], layout, show_nodes, description )
+
+class Preset(NamedTuple):
+    """
+    A choice of node and edge types to display, with how to display them.
+    """
+    nodes: list
+    edges: list
+    layout: str
+    show_empty: str
+    description: str
+
+
+# Graph presets. 'name' : Preset
 ### possibly move into a json file ###
 PRESETS = {
-    'file directory': (['Folder', 'File'], ['Directory'], 'breadthfirst', 'Yes',
-                       "The file organization of the repo. Nodes are either folders or Python files. " +
-                       "A directed edge from **u** to **v** represents '**u** is the parent folder of **v**.'"),
-    'class inheritance': (["Class"], ["Inheritance"], 'cose', 'No',
-                          "The classes that inherit from another class defined within the repo. Nodes are Python classes. " +
-                          "A directed edge from **u** to **v** represents '**u** is a parent class for **v**.'"),
-    'function dependency': (["File", "Class", "Function"], ["Function Call"], 'circle', 'No',
-                            "The function calls within the repo. Nodes represent a Python file, function, or class. " +
-                            "A directed edge from **u** to **v**  represents '**u** is called by **v**.'"),
-    'import dependency': (["File", "Folder"], ["Import"], 'concentric', 'No',
-                          "The imports of each Python file. Nodes are Python files or folders (as Python packages). " +
-                          "A directed edge from **u** to **v**  represents '**u** is imported by **v**.'"),
-    'broad definitions': (["File", "Class", "Function"], ["Definition"], 'cose', 'No',
-                          "The organization of Python class and function definitions. Nodes are files, functions, or classes. " +
-                          "A directed edge from **u** to **v**  represents '**u** defines **v**.'"),
-    'granular definitions': (["File", "Class", "Function", "Variable", "Lambda", "If", "For", "While", "Try"], ["Definition"], 'cose', 'No',
-                             "The variables, lambda expressions, if-statements, for loops, while loops, and try-statements defined within Python files." +
-                             "A directed edge from **u** to **v**  represents '**u** defines **v**.'"),
-    'all': (["File", "Folder", "Class", "Function"], ["Inheritance", "Directory", "Function Call", "Import", "Definition"], 'concentric', 'No',
-            "Every type of node and edge displayed at once."),
-    'custom': ([], [], 'concentric', 'Yes', "Choose the Node and Edge types to include. ")
+    'file directory': Preset(['Folder', 'File'], ['Directory'], 'breadthfirst', 'Yes',
+                             "The file organization of the repo. Nodes are either folders or Python files. " +
+                             "A directed edge from **u** to **v** represents '**u** is the parent folder of **v**.'"),
+    'class inheritance': Preset(["Class"], ["Inheritance"], 'cose', 'No',
+                                "The classes that inherit from another class defined within the repo. Nodes are Python classes. " +
+                                "A directed edge from **u** to **v** represents '**u** is a parent class for **v**.'"),
+    'function dependency': Preset(["File", "Class", "Function"], ["Function Call"], 'circle', 'No',
+                                  "The function calls within the repo. Nodes represent a Python file, function, or class. " +
+                                  "A directed edge from **u** to **v**  represents '**u** is called by **v**.'"),
+    'import dependency': Preset(["File", "Folder"], ["Import"], 'concentric', 'No',
+                                "The imports of each Python file. Nodes are Python files or folders (as Python packages). " +
+                                "A directed edge from **u** to **v**  represents '**u** is imported by **v**.'"),
+    'broad definitions': Preset(["File", "Class", "Function"], ["Definition"], 'cose', 'No',
+                                "The organization of Python class and function definitions. Nodes are files, functions, or classes. " +
+                                "A directed edge from **u** to **v**  represents '**u** defines **v**.'"),
+    'granular definitions': Preset(["File", "Class", "Function", "Variable", "Lambda", "If", "For", "While", "Try"], ["Definition"], 'cose', 'No',
+                                   "The variables, lambda expressions, if-statements, for loops, while loops, and try-statements defined within Python files." +
+                                   "A directed edge from **u** to **v**  represents '**u** defines **v**.'"),
+    'all': Preset(["File", "Folder", "Class", "Function"], ["Inheritance", "Directory", "Function Call", "Import", "Definition"], 'concentric', 'No',
+                  "Every type of node and edge displayed at once."),
+    'custom': Preset([], [], 'concentric', 'Yes', "Choose the Node and Edge types to include. ")
 }
 
 NODE_SHAPES = {
@@ -87,7 +102,39 @@ EDGE_STYLE = {
 }
 
 
-def get_graph_data(graph: nx.MultiDiGraph, positions=None):
+# the element data of each node and the element of each edge, which do not
+# change between callbacks. Nodes are equal by name, so commits share them.
+_node_data = {}
+_edge_elements = weakref.WeakKeyDictionary()
+
+
+def node_data(node):
+    """
+    Gives the element data of ``node``, which must not be modified.
+    """
+    data = _node_data.get(node)
+    if data is None:
+        data = _node_data[node] = {'id': node.name, 'label': node.short_name}
+    return data
+
+
+def edge_element(u, v, d):
+    """
+    Gives the element of the edge ``d`` from ``u`` to ``v``, which must not be
+    modified.
+    """
+    element = _edge_elements.get(d)
+    if element is None:
+        element = _edge_elements[d] = {
+            'data': {
+                'id': f'{str(type(d))}{d.__hash__}',
+                'source': u.name,
+                'target': v.name}
+        }
+    return element
+
+
+def get_graph_data(graph: nx.MultiDiGraph, positions=None, roots=()):
     """
     Transforms the node and edge data to a format that can be displayed.
 
@@ -97,39 +144,65 @@ def get_graph_data(graph: nx.MultiDiGraph, positions=None):
    :param positions: The networkx positions of the nodes that will be used if provided.
    :type positions: {Node : (int,int)} 
 
+   :param roots: the nodes to give the 'root' class, so that one stylesheet rule
+       can style all of them
+   :type roots: Node set
+
    :return: a list of all node and edge data in the graph
    :rtype: str list
     """
-    if not positions:
-        n_list = [{
-            'data': {
-                'id': node.get_name(),
-                'label': node.get_name().split(os.sep)[-1]}
-        } for node in graph.nodes]
-    else:
-        n_list = [{
-            'data': {
-                'id': node.get_name(),
-                'label': node.get_name().split(os.sep)[-1]},
-            'position': {'x': positions[node][0], 'y':positions[node][1]}
-        } for node in graph.nodes]
-
-    e_list = [{
-        'data': {
-            'id': f'{str(type(d))}{d.__hash__}',
-            'source':  u.get_name(),
-            'target': v.get_name()}
-    } for u, v, d in graph.edges(data='edge')]
+    # one node list is built either way; positions are added when given
+    n_list = [{'data': node_data(node)} for node in graph]
+    if roots:
+        for n_data, node in zip(n_list, graph):
+            if node in roots:
+                n_data['classes'] = 'root'
+    if positions:
+        for n_data, node in zip(n_list, graph):
+            x, y = positions[node]
+            n_data['position'] = {'x': x, 'y': y}
+
+    # the adjacency dicts are walked directly rather than through an EdgeView
+    e_list = []
+    append = e_list.append
+    for u, nbrs in graph._adj.items():
+        for v, keydict in nbrs.items():
+            for attr in keydict.values():
+                append(edge_element(u, v, attr['edge']))
 
     return n_list + e_list
 
 
-def get_commit_data(commits, commit_dict, preset='all', matrix_type='adjacency', spectrum_type='eigenvalue'):
+# the least total number of nodes of the unique subgraphs worth starting worker
+# processes for. Each spectrum costs about the cube of the size of its subgraph,
+# so a few small subgraphs are faster to analyze than to send to workers.
+_PARALLEL_MIN_NODES = 2000
+
+
+def get_energy(graph, matrix_type='adjacency', spectrum_type='eigenvalue'):
     """
-    Computes data from the provided commits that can be graphed.
+    Computes the graph energy of ``graph``, the sum of the absolute values of its
+    spectrum.
 
-    :param commits: the commit objects to analyze
-    :type commits: git.objects.commit.Commit list
+    :param graph: the graph to analyze
+    :type graph: networkx.MultiDiGraph
+
+    :return: the energy of ``graph``
+    :rtype: float
+    """
+    import numpy as np
+    import matrix
+
+    mat = matrix.graph_to_matrix(graph, matrix=matrix_type)
+    eig_vals = matrix.analyze_matrix(mat, type=spectrum_type)[0]
+    return float(np.abs(eig_vals).sum())
+
+
+def get_energies(commit_dict, preset='all', matrix_type='adjacency', spectrum_type='eigenvalue', max_workers=1):
+    """
+    Computes the graph energy of every unique subgraph of the commit graphs.
+    Many large subgraphs may be split across worker processes, see
+    ``pool.fork_map``, but not from a Dash callback, as the server runs in threads.
 
     :param commit_dict: the sha1-graph dictionary for the repo
     :type commit_dict: {str : networkx.MultiDiGraph}
@@ -137,32 +210,61 @@ def get_commit_data(commits, commit_dict, preset='all', matrix_type='adjacency',
     :param preset: the subgraph preset to analyze the commit graphs with. Defaults to 'all'.
     :type preset: str
 
-    :return: the data to plot on a x-axis and y-axis, respectively.
-    :rtype: tuple
+    :param max_workers: the number of worker processes to use, or None for the
+        number of CPUs. Defaults to 1, which computes the energies in this process.
+    :type max_workers: int
+
+    :return: the energy of each unique subgraph, with the sha1's of the commits it represents
+    :rtype: (float, str list) list
     """
+    # the spectrum is only computed once per unique subgraph
     subgraphs = metrics.unique_subgraphs(commit_dict, preset)
-    commit_times = metrics.get_dates(commits)
+    graphs = [graph for graph, _ in subgraphs]
+    if sum(map(len, graphs)) < _PARALLEL_MIN_NODES:
+        max_workers = 1
 
-    x = []
-    y = []
+    energies = pool.fork_map(get_energy, graphs, matrix_type, spectrum_type,
+                             max_workers=max_workers)
 
-    for graph, sha1_list in subgraphs:
+    return [(energy, sha1_list)
+            for energy, (_, sha1_list) in zip(energies, subgraphs)]
 
-        # Graph energy for testing
-        mat = matrix.graph_to_matrix(graph, matrix=matrix_type)
-        eig_vals = matrix.analyze_matrix(mat, type=spectrum_type)[0]
-        energy = 0
-        for val in eig_vals:
-            energy += abs(val)
 
-        # create data points
-        for sha1 in sha1_list:
-            try:
-                date = commit_times[sha1]
-                x.append(date)
-                y.append(energy)
-            except KeyError:
-                pass
+def get_commit_data(commits, commit_dict, preset='all', matrix_type='adjacency', spectrum_type='eigenvalue', energies=None, commit_times=None):
+    """
+    Computes data from the provided commits that can be graphed.
+
+    :param commits: the commit objects to analyze
+    :type commits: git.objects.commit.Commit list
+
+    :param commit_dict: the sha1-graph dictionary for the repo
+    :type commit_dict: {str : networkx.MultiDiGraph}
+
+    :param preset: the subgraph preset to analyze the commit graphs with. Defaults to 'all'.
+    :type preset: str
+
+    :param energies: the result of ``get_energies`` for the same arguments, if
+        already computed
+    :type energies: (float, str list) list
+
+    :param commit_times: the result of ``metrics.get_dates(commits)``, if already
+        computed
+    :type commit_times: {str : datetime}
+
+    :return: the data to plot on a x-axis and y-axis, respectively.
+    :rtype: tuple
+    """
+    if energies is None:
+        energies = get_energies(commit_dict, preset, matrix_type, spectrum_type)
+    if commit_times is None:
+        commit_times = metrics.get_dates(commits)
+
+    # create data points, for the commits in ``commits`` only
+    points = [(commit_times[sha1], energy)
+              for energy, sha1_list in energies
+              for sha1 in sha1_list if sha1 in commit_times]
+    x = [date for date, _ in points]
+    y = [energy for _, energy in points]
 
     return (x, y)
 
@@ -171,6 +273,11 @@ def ControlTab():
     """
     The component that changes the settings and layout of the graph.
     """
+    import dash_cytoscape as cyto
+    import dash_html_components as html
+    import dash_core_components as dcc
+    import dash_reusable_components as drc
+
     return dcc.Tab(label='Control Panel', children=[
         drc.NamedRadioItems(id='radio-mode', name='Choose graph mode', options=drc.DropdownOptionsList(
             'exploration',
@@ -272,6 +379,11 @@ def AnalysisTab(dates: list[datetime], commits):
     The component that allows for many commits to be analyzed,and to choose the
     current commit to graph.
     """
+    import dash_html_components as html
+    import dash_core_components as dcc
+    import dash_reusable_components as drc
+    import matrix
+
     return dcc.Tab(label='Analysis', children=[
         dcc.Checklist(
             id='choose-commit', options=[{'label': 'Choose Commit', 'value': 'show'}]),
@@ -311,15 +423,16 @@ def get_roots(graph):
     Lists the id's of the roots of ``graph``.
     """
     roots = []
-    for n in graph.nodes:
+    # one pass over the degree views, rather than a view per node
+    for (n, in_deg), (_, deg) in zip(graph.in_degree(), graph.degree()):
         # if n is a root
-        if graph.in_degree(n) == 0 and graph.degree(n) != 0:
+        if in_deg == 0 and deg != 0:
             roots.append(n.get_name())
 
     return roots
 
 
-def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict: dict[str, MultiDiGraph]):
+def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict: dict[str, MultiDiGraph], precompute_energies=False):
     """
     Creates the Dash app and runs the development server.
 
@@ -328,7 +441,110 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
 
     :param commit_dict: the dictionary produced by the main module mapping SHA1 to relationship graph of each commit.
     :type commit_dict: {str, MultiDiGraph} dict
+
+    :param precompute_energies: whether to compute the energies of the default
+        commit chart, with one process per CPU, before the server starts. By
+        default they are computed when the chart is first shown.
+    :type precompute_energies: bool
     """
+    import dash
+    import dash_cytoscape as cyto
+    from dash.dependencies import Input, Output, State
+    from dash.exceptions import PreventUpdate
+    import dash_html_components as html
+    import dash_core_components as dcc
+    import dash_reusable_components as drc
+    import plotly.graph_objects as go
+    import webbrowser as web
+
+    # the callbacks of one click all ask for the same subgraph, so each one is
+    # only made once. The subgraphs are shared, so they must not be modified.
+    @lru_cache(maxsize=64)
+    def cached_subgraph(sha1, nodes, edges):
+        new_graph = subgraph.subgraph(commit_dict[sha1], nodes, edges)
+
+        # find the roots and the nodes without edges in one pass over the degrees
+        roots, empty = [], []
+        for (n, in_deg), (_, deg) in zip(new_graph.in_degree(), new_graph.degree()):
+            if deg == 0:
+                empty.append(n)
+            elif in_deg == 0:
+                roots.append(n)
+        return new_graph, frozenset(roots), frozenset(empty)
+
+    def get_subgraph(sha1, node_list, edge_list):
+        """
+        Gives the subgraph of the graph of commit ``sha1`` with the node and edge
+        types in ``node_list`` and ``edge_list``, the set of its roots, and the set
+        of its nodes without edges.
+        """
+        return cached_subgraph(sha1, tuple(sorted(node_list)), tuple(sorted(edge_list)))
+
+    # the shape, size and line style of each element only depend on the
+    # subgraph, so the rules, and their selector strings, are built once per
+    # subgraph. The rules are shared, so they must not be modified.
+    @lru_cache(maxsize=64)
+    def cached_shape_rules(sha1, nodes, edges):
+        new_graph, _, _ = cached_subgraph(sha1, nodes, edges)
+        rules = []
+
+        for n in new_graph.nodes:
+            shape = NODE_SHAPES.get(type(n))
+            size = len(new_graph.succ[n])*2 + 20
+
+            rules.append({
+                "selector": 'node[id = "{}"]'.format(n.get_name()),
+                "style": {'shape': shape,
+                          'width': size,
+                          'height': size
+                          }
+            })
+
+        for u, v, d in new_graph.edges(data=True):
+            line_style = EDGE_STYLE.get(type(d['edge']))
+
+            rules.append({
+                "selector": 'edge[id = "{}"]'.format(edge_element(u, v, d['edge'])['data']['id']),
+                "style": {'line-style': line_style}
+            })
+
+        return tuple(rules)
+
+    def get_shape_rules(sha1, node_list, edge_list):
+        """
+        Gives the stylesheet rules for the shape and size of every node and the
+        line style of every edge of the subgraph given by ``get_subgraph``.
+        """
+        return cached_shape_rules(sha1, tuple(sorted(node_list)), tuple(sorted(edge_list)))
+
+    # reading the date of a commit loads it from git, so it is only done once
+    commit_times = metrics.get_dates(commits)
+    dates = list(commit_times.values())
+
+    # the commits sorted by date, so a range of dates is found by bisection
+    order = sorted(range(len(commits)), key=dates.__getitem__)
+    sorted_commits = [commits[i] for i in order]
+    sorted_dates = [dates[i] for i in order]
+
+    # the energies only depend on the preset and the matrix, not on the range of
+    # dates, so moving the date slider does not compute them again. There are
+    # only as many keys as there are presets, matrices and spectra.
+    energy_cache = {}
+
+    def cached_energies(preset, m_type, s_type):
+        key = (preset, m_type, s_type)
+        if key not in energy_cache:
+            # callbacks run in the server's threads, so never start processes here
+            energy_cache[key] = get_energies(commit_dict, preset, m_type, s_type)
+        return energy_cache[key]
+
+    if precompute_energies:
+        # the server has not started, so this is the only thread, and the
+        # energies may be split across processes
+        default_energies = ('file directory', 'adjacency', 'eigenvalue')
+        energy_cache[default_energies] = get_energies(
+            commit_dict, *default_energies, max_workers=None)
+
     default_stylesheet = [
         {
             "selector": 'edge',
@@ -373,7 +589,7 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
                      dcc.Tabs(id='tabs', children=[
                          ControlTab(),
                          AnalysisTab(
-                             list(metrics.get_dates(commits).values()), commits),
+                             dates, commits),
                      ]),
                  ])
     ])
@@ -420,8 +636,7 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
 
         # get graph
         sha1 = graph_sha1['graph_sha1']
-        graph = commit_dict[sha1]
-        new_graph = subgraph.subgraph(graph, node_list, edge_list)
+        new_graph, roots, _ = get_subgraph(sha1, node_list, edge_list)
 
         # if tapped node is not a leaf, dont update
         if tapped_node != None:
@@ -449,8 +664,7 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
             allowed_nodes = []
             # only allow roots at first
             for n in new_graph.nodes:
-                # if n is a root
-                if new_graph.in_degree(n) == 0 and new_graph.degree(n) != 0:
+                if n in roots:
                     allowed_nodes.append(n.get_name())
                     for direct_child in new_graph.successors(n):
                         allowed_nodes.append(direct_child.get_name())
@@ -470,8 +684,7 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
     def update_graph_layout(layout, graph_sha1, node_list, edge_list):
         # get graph
         sha1 = graph_sha1['graph_sha1']
-        graph = commit_dict[sha1]
-        new_graph = subgraph.subgraph(graph, node_list, edge_list)
+        new_graph, _, _ = get_subgraph(sha1, node_list, edge_list)
 
         if layout == 'cose':
             return {'name': 'cose', 'animate': False, 'numIter': 500}
@@ -491,10 +704,11 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
                   [Input('dropdown-presets', 'value')])
     def preset_graph(preset):
         if preset == 'custom':
-            return (dash.no_update, dash.no_update, dash.no_update, dash.no_update, [dcc.Markdown(PRESETS.get('custom')[4])])
-        nodes, edges, layout, show_empty, description = PRESETS.get(
-            preset, 'invalid preset')
-        return (nodes, edges, layout, show_empty, [dcc.Markdown(description)])
+            return (dash.no_update, dash.no_update, dash.no_update, dash.no_update, [dcc.Markdown(PRESETS['custom'].description)])
+        p = PRESETS.get(preset)
+        if p is None:
+            raise PreventUpdate
+        return (p.nodes, p.edges, p.layout, p.show_empty, [dcc.Markdown(p.description)])
 
     @app.callback(Output('preferences-container', 'hidden'),
                   [Input('dropdown-presets', 'value')])
@@ -512,24 +726,23 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
     def update_graph_data(node_list, edge_list, show_empty, graph_sha1, explore_nodes, mode):
         # get graph
         sha1 = graph_sha1['graph_sha1']
-        graph = commit_dict[sha1]
-        new_graph = subgraph.subgraph(graph, node_list, edge_list)
+        new_graph, roots, empty = get_subgraph(sha1, node_list, edge_list)
 
-        removes = []
-        for n in new_graph.nodes:
-            if show_empty == "No" and new_graph.degree(n) == 0:
-                removes.append(n)
+        removes = set(empty) if show_empty == "No" else set()
 
         # remove unexplored nodes if in explore mode
         if mode == 'exploration':
             allowed_nodes = explore_nodes['nodes']
             for n in new_graph.nodes:
                 if n.get_name() not in allowed_nodes:
-                    removes.append(n)
+                    removes.add(n)
 
-        new_graph.remove_nodes_from(removes)
+        # the cached subgraph is shared, so only a view of it leaves nodes out
+        if removes:
+            new_graph = new_graph.subgraph(
+                [n for n in new_graph.nodes if n not in removes])
 
-        return get_graph_data(new_graph)
+        return get_graph_data(new_graph, roots=roots)
 
     def color_nodes(elements, stylesheet, tapped_node, following_color, follower_color):
         """
@@ -537,64 +750,77 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
         Prerequisites: ``tapped_node`` cannot be ``None``.
         """
         node_id = tapped_node['data']['id']
+
+        # gather the neighbors first, so each group is styled by one rule with a
+        # grouped selector rather than by a rule per edge
+        following = {}
+        followers = {}
         for edge in elements:
-            try:
-                if edge['data']['source'] == node_id:
-                    stylesheet.append({
-                        "selector": 'node[id = "{}"]'.format(edge['data']['target']),
-                        "style": {
-                            'background-color': following_color,
-                            'opacity': 0.9,
-                            "label": "data(label)"
-                        }
-                    })
-                    stylesheet.append({
-                        "selector": 'edge[source= "{}"]'.format(node_id),
-                        "style": {
-                            "mid-target-arrow-color": following_color,
-                            "mid-target-arrow-shape": 'triangle-backcurve',
-                            "line-color": following_color,
-                            'opacity': 0.7,
-                            'z-index': 5000,
-                            'arrow-scale': 3
-                        }
-                    })
-
-                if edge['data']['target'] == node_id:
-                    stylesheet.append({
-                        "selector": 'node[id = "{}"]'.format(edge['data']['source']),
-                        "style": {
-                            'background-color': follower_color,
-                            'opacity': 0.9,
-                            'z-index': 9999,
-                            "label": "data(label)",
-                        }
-                    })
-                    stylesheet.append({
-                        "selector": 'edge[target= "{}"]'.format(node_id),
-                        "style": {
-                            "mid-target-arrow-color": follower_color,
-                            "mid-target-arrow-shape": 'triangle-backcurve',
-                            "line-color": follower_color,
-                            'opacity': 0.7,
-                            'z-index': 5000,
-                            'arrow-scale': 3
-                        }
-                    })
-            except KeyError:
-                pass
+            data = edge['data']
+            if 'source' not in data:
+                continue  # a node
+            if data['source'] == node_id:
+                following[data['target']] = None
+            if data['target'] == node_id:
+                followers[data['source']] = None
+
+        if following:
+            stylesheet.append({
+                "selector": ', '.join('node[id = "{}"]'.format(n) for n in following),
+                "style": {
+                    'background-color': following_color,
+                    'opacity': 0.9,
+                    "label": "data(label)"
+                }
+            })
+            stylesheet.append({
+                "selector": 'edge[source= "{}"]'.format(node_id),
+                "style": {
+                    "mid-target-arrow-color": following_color,
+                    "mid-target-arrow-shape": 'triangle-backcurve',
+                    "line-color": following_color,
+                    'opacity': 0.7,
+                    'z-index': 5000,
+                    'arrow-scale': 3
+                }
+            })
+
+        if followers:
+            stylesheet.append({
+                "selector": ', '.join('node[id = "{}"]'.format(n) for n in followers),
+                "style": {
+                    'background-color': follower_color,
+                    'opacity': 0.9,
+                    'z-index': 9999,
+                    "label": "data(label)",
+                }
+            })
+            stylesheet.append({
+                "selector": 'edge[target= "{}"]'.format(node_id),
+                "style": {
+                    "mid-target-arrow-color": follower_color,
+                    "mid-target-arrow-shape": 'triangle-backcurve',
+                    "line-color": follower_color,
+                    'opacity': 0.7,
+                    'z-index': 5000,
+                    'arrow-scale': 3
+                }
+            })
 
     @app.callback([Output('graph', 'stylesheet'), Output('prev-node', 'data')],
                   [Input('graph', 'tapNode'),
-                   Input('prev-node', 'data'),
                    Input('graph-sha1', 'data'),
                    Input('dropdown-node-preferences', 'value'),
                    Input('dropdown-edge-preferences', 'value'),
                    Input('input-follower-color', 'value'),
                    Input('input-following-color', 'value'),
                    Input('input-root-color', 'value')
-                   ])
-    def generate_stylesheet(tapped_node, prev_node_data, graph_data, node_list, edge_list, follower_color, following_color, root_color):
+                   ],
+                  # only read: the previous node is written by this callback
+                  [State('prev-node', 'data')],
+                  # runs once the preset callback sets the dropdowns
+                  prevent_initial_call=True)
+    def generate_stylesheet(tapped_node, graph_data, node_list, edge_list, follower_color, following_color, root_color, prev_node_data):
         # always color the roots
         stylesheet = [
             {
@@ -605,40 +831,17 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
                 }}
         ]
         sha1 = graph_data['graph_sha1']
-        graph = commit_dict[sha1]
-        new_graph = subgraph.subgraph(graph, node_list, edge_list)
-        for n in new_graph.nodes:
-            shape = NODE_SHAPES.get(type(n))
-            size = len(list(new_graph.successors(n)))*2 + 20
-
-            if new_graph.in_degree(n) == 0 and new_graph.degree(n) != 0:
-                stylesheet.append({
-                    "selector": 'node[id = "{}"]'.format(n.get_name()),
-                    "style": {
-                        'background-color': root_color,
-                        'opacity': 0.9,
-                        'label': 'data(label)',
-                        'shape': shape,
-                        'width': size,
-                        'height': size
-                    }
-                })
-            else:
-                stylesheet.append({
-                    "selector": 'node[id = "{}"]'.format(n.get_name()),
-                    "style": {'shape': shape,
-                                'width': size,
-                                'height': size
-                              }
-                })
-
-        for u, v, d in new_graph.edges(data=True):
-            line_style = EDGE_STYLE.get(type(d['edge']))
-
-            stylesheet.append({
-                "selector": 'edge[id = "{}"]'.format(f"{str(type(d['edge']))}{d['edge'].__hash__}"),
-                "style": {'line-style': line_style}
-            })
+        # the roots are given the 'root' class by get_graph_data, so one rule
+        # colors all of them
+        stylesheet.append({
+            "selector": 'node.root',
+            "style": {
+                'background-color': root_color,
+                'opacity': 0.9,
+                'label': 'data(label)'
+            }
+        })
+        stylesheet += get_shape_rules(sha1, node_list, edge_list)
 
         if tapped_node is None or tapped_node['data']['id'] == prev_node_data['prev_node']:
             prev_node_data.update({'prev_node': None})
@@ -670,6 +873,7 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
             }
         }]
 
+        new_graph, _, _ = get_subgraph(sha1, node_list, edge_list)
         new_elements = get_graph_data(new_graph)
         color_nodes(new_elements, stylesheet, tapped_node,
                     following_color, follower_color)
@@ -693,31 +897,38 @@ def display(repo_name: str, rs: redis.Redis, commits: list[Commit], commit_dict:
                    Input('slider-date-picker', 'value'),
                    Input('dropdown-matrix-type', 'value'),
                    Input('dropdown-spectrum-type', 'value')
-                   ])
+                   ],
+                  # the chart is hidden until commits are shown
+                  prevent_initial_call=True)
     def update_line_chart(show_commits, current_fig, preset, range, m_type, s_type):
         if not show_commits:
             return (current_fig, True, '', True)
+        elif [t['prop_id'] for t in dash.callback_context.triggered] == ['commit-chart.figure']:
+            # only the figure changed, which is what this callback itself returns
+            return (dash.no_update, dash.no_update, dash.no_update, dash.no_update)
         else:
             min_index, max_index = range
-            dates = list(metrics.get_dates(commits).values())
 
             # commits are in reverse chronological order
             min_date = dates[(-1 - min_index) % len(dates)]
             max_date = dates[(-1 - max_index) % len(dates)]
 
             # only give commits within the date range
-            new_commits = [commit for commit in commits
-                           if min_date <= commit.committed_datetime <= max_date]
+            lo = bisect_left(sorted_dates, min_date)
+            hi = bisect_right(sorted_dates, max_date)
+            new_commits = sorted_commits[lo:hi]
+            new_times = {commit.hexsha: date for commit, date
+                         in zip(new_commits, sorted_dates[lo:hi])}
 
             msg = f"You have selected {min_date.strftime('%x')} to {max_date.strftime('%x')}."
 
             x, y = get_commit_data(
-                new_commits, commit_dict, preset, matrix_type=m_type, spectrum_type=s_type)
-            df = pd.DataFrame(
-                {'Commit Date': x, 'Graph Energy': y})
-
-            fig = px.scatter(df, x="Commit Date",
-                             y="Graph Energy",)
+                new_commits, commit_dict, preset, matrix_type=m_type, spectrum_type=s_type,
+                energies=cached_energies(preset, m_type, s_type), commit_times=new_times)
+            # WebGL markers, built straight from the lists without a DataFrame
+            fig = go.Figure(go.Scattergl(x=x, y=y, mode='markers'))
+            fig.update_layout(xaxis_title="Commit Date",
+                              yaxis_title="Graph Energy")
 
             return (fig, False, msg, False)
 